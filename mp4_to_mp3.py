@@ -1,32 +1,584 @@
-import os
-
-def convert_to_mp3(input_file, output_file):
-    command = f'ffmpeg -i "{input_file}" -vn -acodec libmp3lame -q:a 4 "{output_file}"'
-    os.system(command)
-
-def main():
-    print("This script will scan a given folder and create MP3 files in this folder based on the MP4 files in this folder." +
-          "No file will be deleted, or overwritten. If an MP3 file already exists with the same name of an MP4 file, it will not be converted.")
-    input_folder = input("Input folder: ")
-    output_folder = input_folder
-
-    # Create output folder if it doesn't exist
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
-
-    # Loop through all files in the input folder
-    for file_name in os.listdir(input_folder):
-        if file_name.endswith(".mp4"):
-            input_file = os.path.join(input_folder, file_name)
-            output_file = os.path.join(output_folder, os.path.splitext(file_name)[0] + ".mp3")
-
-            # Skip conversion if the output file already exists
-            if os.path.exists(output_file):
-                print(f"Skipped: {output_file} already exists.")
-                continue
-
-            convert_to_mp3(input_file, output_file)
-            print(f"Converted: {input_file} -> {output_file}")
-
-if __name__ == "__main__":
-    main()
\ No newline at end of file
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+
+# Print a progress line for a running file at most this often (seconds)
+PROGRESS_INTERVAL = 10.0
+# Number of stderr lines kept per failed file
+ERROR_TAIL_LINES = 5
+# Jobs queued per worker; discovery of further files waits until they are taken
+QUEUED_JOBS_PER_WORKER = 2
+SIZE_UNITS = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4}
+
+# Output container for audio that can be stream-copied, per target policy.
+# "mp3":  always produce .mp3, copy only if the source audio already is MP3
+# "keep": also keep AAC as it is (in an .m4a container) instead of re-encoding
+COPY_TARGETS = {
+    "mp3": {"mp3": ".mp3"},
+    "keep": {"mp3": ".mp3", "aac": ".m4a"},
+}
+ENCODE_EXTENSION = ".mp3"
+
+# Default journal file name, created in the output folder
+JOURNAL_NAME = ".mp4_to_mp3-journal.jsonl"
+# An existing output counts as complete if its duration is this close to the source (seconds)
+DEFAULT_TOLERANCE = 1.0
+
+
+@dataclass
+class Job:
+    input_file: str
+    output_base: str                # output path without extension
+    codec: str = None               # audio codec of the input, from ffprobe
+    duration: float = None          # input duration in seconds, from ffprobe
+    strategy: str = None            # "copy", "encode" or "no-audio"
+    output_file: str = None
+
+
+@dataclass
+class JobResult:
+    job: Job
+    returncode: int = 0
+    skipped: bool = False
+    media_seconds: float = 0.0      # audio duration ffmpeg reported as written
+    wall_seconds: float = 0.0
+    errors: list = field(default_factory=list)
+
+    @property
+    def ok(self):
+        return self.returncode == 0
+
+
+class Journal:
+    """
+    Append-only JSON-lines log of the status of every converted file.
+
+    Each line records one state change ("started", "done", "failed") of an
+    input file. When loading, the last line per input wins, so a file that
+    was "started" but never reached "done" is known to be unfinished.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue        # torn last line of a killed run
+                    self.entries[entry["input"]] = entry
+
+    def get(self, input_file):
+        return self.entries.get(input_file)
+
+    def record(self, job, status, **extra):
+        entry = {"input": job.input_file, "output": job.output_file, "status": status,
+                 "time": time.time(), **extra}
+        if status == "done":
+            entry.update(file_signature(job.input_file, "input_"))
+            entry.update(file_signature(job.output_file, "output_"))
+        with self._lock:
+            self.entries[job.input_file] = entry
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+
+def file_signature(path, prefix=""):
+    """Size and modification time of a file, used to notice changed files."""
+    st = os.stat(path)
+    return {prefix + "size": st.st_size, prefix + "mtime_ns": st.st_mtime_ns}
+
+
+def temp_output_path(output_file):
+    """Hidden temporary name next to output_file, keeping its extension for ffmpeg."""
+    folder, name = os.path.split(output_file)
+    stem, ext = os.path.splitext(name)
+    return os.path.join(folder, f".{stem}.partial{ext}")
+
+
+def iter_media_files(root, extensions, recursive=True, min_size=None, max_size=None,
+                     newer_than=None, older_than=None):
+    """
+    Yield paths of matching files below root as they are found.
+
+    Uses os.scandir, whose directory entries carry the file type, so only
+    files with a matching extension need a stat() call for the size and
+    modification time filters. Directories are walked depth-first in sorted
+    order without ever listing the whole tree.
+    """
+    extensions = tuple(ext.lower() for ext in extensions)
+    stack = [root]
+    while stack:
+        folder = stack.pop()
+        subfolders = []
+        try:
+            with os.scandir(folder) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError as e:
+            print(f"Cannot read {folder}: {e}")
+            continue
+
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subfolders.append(entry.path)
+                    continue
+                if not entry.name.lower().endswith(extensions) or not entry.is_file():
+                    continue
+                st = entry.stat()
+            except OSError as e:
+                print(f"Cannot read {entry.path}: {e}")
+                continue
+            if min_size is not None and st.st_size < min_size:
+                continue
+            if max_size is not None and st.st_size > max_size:
+                continue
+            if newer_than is not None and st.st_mtime < newer_than:
+                continue
+            if older_than is not None and st.st_mtime >= older_than:
+                continue
+            yield entry.path
+
+        if recursive:
+            stack.extend(reversed(subfolders))
+
+
+def iter_jobs(input_root, output_root, files):
+    """Jobs for files below input_root, mirroring their folders into output_root."""
+    for input_file in files:
+        relative = os.path.relpath(input_file, input_root)
+        output_base = os.path.join(output_root, os.path.splitext(relative)[0])
+        yield Job(input_file, output_base)
+
+
+def parse_size(text):
+    """Parse sizes like 500, 200k, 1.5G (binary units) into bytes."""
+    text = text.strip().lower().removesuffix("b")
+    number, unit = (text[:-1], text[-1]) if text and text[-1] in SIZE_UNITS else (text, "")
+    try:
+        return int(float(number) * SIZE_UNITS[unit])
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {text!r}")
+
+
+def parse_date(text):
+    """Parse an ISO date or date-time into a POSIX timestamp."""
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date: {text!r} (expected e.g. 2024-05-31)")
+
+
+def probe(input_file):
+    """
+    Return (audio codec, duration in seconds) of a file using ffprobe.
+
+    The codec is None if the file has no audio stream, the duration is None
+    if ffprobe cannot determine it.
+    """
+    command = [
+        "ffprobe", "-v", "error",
+        "-select_streams", "a:0",
+        "-show_entries", "stream=codec_name:format=duration",
+        "-of", "json",
+        input_file,
+    ]
+    completed = subprocess.run(command, capture_output=True, text=True, stdin=subprocess.DEVNULL)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip() or f"ffprobe exited with {completed.returncode}")
+
+    info = json.loads(completed.stdout or "{}")
+    streams = info.get("streams") or [{}]
+    codec = streams[0].get("codec_name")
+    try:
+        duration = float(info.get("format", {}).get("duration"))
+    except (TypeError, ValueError):
+        duration = None
+    return codec, duration
+
+
+def plan_job(job, policy="mp3"):
+    """
+    Decide how to convert a job by inspecting its audio codec.
+
+    Audio that the target policy accepts as it is gets remuxed with
+    "-c:a copy", which only copies packets and is orders of magnitude faster
+    than decoding and re-encoding. Everything else is encoded to MP3.
+    """
+    job.codec, job.duration = probe(job.input_file)
+    copy_targets = COPY_TARGETS[policy]
+
+    if job.codec is None:
+        job.strategy = "no-audio"
+        job.output_file = None
+    elif job.codec in copy_targets:
+        job.strategy = "copy"
+        job.output_file = job.output_base + copy_targets[job.codec]
+    else:
+        job.strategy = "encode"
+        job.output_file = job.output_base + ENCODE_EXTENSION
+    return job
+
+
+def build_ffmpeg_command(job, output_file):
+    """ffmpeg argument list for converting one planned job; no shell involved."""
+    if job.strategy == "copy":
+        audio_options = ["-c:a", "copy"]
+    else:
+        audio_options = ["-c:a", "libmp3lame", "-q:a", "4"]
+
+    return [
+        "ffmpeg", "-hide_banner", "-nostdin", "-nostats",
+        "-loglevel", "error",
+        "-y",                       # output_file is a temporary file, see convert()
+        "-i", job.input_file,
+        "-map", "0:a:0", "-vn",
+        *audio_options,
+        "-progress", "pipe:1",
+        output_file,
+    ]
+
+
+def convert(job, on_progress=None):
+    """
+    Run ffmpeg for one planned job and return a JobResult.
+
+    ffmpeg's machine readable progress (key=value lines on stdout) is parsed
+    while it runs; on_progress(media_seconds) is called for every update.
+    stderr goes to a temporary file so a chatty ffmpeg can never block on a
+    full pipe.
+
+    ffmpeg writes to a temporary name which is renamed to job.output_file
+    only after it finished successfully, so an interrupted conversion never
+    leaves a truncated file under the final name.
+    """
+    result = JobResult(job)
+    partial_file = temp_output_path(job.output_file)
+    command = build_ffmpeg_command(job, partial_file)
+    start = time.monotonic()
+
+    with tempfile.TemporaryFile(mode="w+", encoding="utf-8", errors="replace") as stderr:
+        try:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr,
+                                       stdin=subprocess.DEVNULL, text=True)
+        except OSError as e:
+            result.returncode = -1
+            result.errors = [f"could not start ffmpeg: {e}"]
+            return result
+
+        with process:
+            for line in process.stdout:
+                key, _, value = line.strip().partition("=")
+                # out_time_us is the position in the output, in microseconds
+                # (older ffmpeg versions report the same value as out_time_ms)
+                if key in ("out_time_us", "out_time_ms") and value.isdigit():
+                    result.media_seconds = int(value) / 1_000_000
+                    if on_progress:
+                        on_progress(result.media_seconds)
+
+        result.returncode = process.returncode
+        stderr.seek(0)
+        result.errors = [line.rstrip() for line in stderr if line.strip()][-ERROR_TAIL_LINES:]
+
+    if result.ok:
+        os.replace(partial_file, job.output_file)
+    elif os.path.exists(partial_file):
+        os.remove(partial_file)
+
+    result.wall_seconds = time.monotonic() - start
+    return result
+
+
+def output_is_complete(job, journal=None, tolerance=DEFAULT_TOLERANCE):
+    """
+    Check whether an existing job.output_file is a finished conversion.
+
+    A journal entry marked "done" whose recorded sizes and modification
+    times still match both files is trusted without looking at the file.
+    Otherwise the durations of input and output are compared with ffprobe.
+    Returns True/False, or None if the durations cannot be determined
+    (run_jobs then converts again, an unverified output is never trusted).
+    """
+    entry = journal.get(job.input_file) if journal else None
+    if entry and entry["status"] == "done" and entry["output"] == job.output_file:
+        try:
+            current = {**file_signature(job.input_file, "input_"),
+                       **file_signature(job.output_file, "output_")}
+        except OSError:
+            current = None
+        if current and all(entry.get(key) == value for key, value in current.items()):
+            return True
+
+    try:
+        _, output_duration = probe(job.output_file)
+    except (OSError, RuntimeError):
+        return False                # unreadable output, e.g. truncated header
+    if job.duration is None or output_duration is None:
+        return None
+    return abs(output_duration - job.duration) <= tolerance
+
+
+def format_plan_row(job):
+    duration = f"{job.duration:.0f}s" if job.duration is not None else "?"
+    output = job.output_file or "-"
+    return f"{job.strategy:<9} {job.codec or '-':<8} {duration:>8}  {job.input_file} -> {output}"
+
+
+def run_jobs(jobs, max_workers=None, policy="mp3", dry_run=False,
+             journal=None, tolerance=DEFAULT_TOLERANCE):
+    """
+    Plan and convert all jobs with at most max_workers ffmpeg processes at a time.
+
+    jobs may be any iterable, e.g. a generator that is still walking the
+    input tree; it is consumed only as fast as the workers take jobs.
+
+    Prints one line per finished file and a summary with the total
+    throughput in media-seconds per wall-second. With dry_run, only the
+    chosen strategy for every file is printed as a table, in the order of
+    jobs. Existing outputs
+    are only skipped if output_is_complete() confirms them; the status of
+    every conversion is written to the journal. Returns a dict with the
+    number of converted, skipped and failed files.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    print_lock = threading.Lock()
+
+    def report(message):
+        with print_lock:
+            print(message, flush=True)
+
+    def process(job):
+        result = JobResult(job)
+        try:
+            plan_job(job, policy)
+        except (OSError, RuntimeError) as e:
+            result.returncode = -1
+            result.errors = [f"could not probe: {e}"]
+            report(f"FAILED: {job.input_file}")
+            report(f"    {result.errors[0]}")
+            return result
+
+        if dry_run:
+            result.skipped = True     # the plan row is printed by collect(), in input order
+            return result
+        if job.strategy == "no-audio":
+            report(f"Skipped: {job.input_file} has no audio stream.")
+            result.skipped = True
+            return result
+        os.makedirs(os.path.dirname(job.output_file) or ".", exist_ok=True)
+
+        # Skip conversion if a complete output file already exists
+        if os.path.exists(job.output_file):
+            complete = output_is_complete(job, journal, tolerance)
+            if complete:
+                report(f"Skipped: {job.output_file} already exists.")
+                entry = journal.get(job.input_file) if journal else None
+                if journal and (entry is None or entry["status"] != "done"):
+                    journal.record(job, "done")
+                result.skipped = True
+                return result
+            if complete is None:
+                report(f"Unverified: duration of {job.output_file} could not be checked, converting again.")
+            else:
+                report(f"Incomplete: {job.output_file} does not match the source, converting again.")
+
+        name = os.path.basename(job.input_file)
+        last_report = time.monotonic()
+
+        def on_progress(media_seconds):
+            nonlocal last_report
+            now = time.monotonic()
+            if now - last_report >= PROGRESS_INTERVAL:
+                last_report = now
+                if job.duration:
+                    report(f"  ... {name}: {100 * media_seconds / job.duration:.0f}%")
+                else:
+                    report(f"  ... {name}: {media_seconds:.0f}s converted")
+
+        if journal:
+            journal.record(job, "started", strategy=job.strategy)
+        result = convert(job, on_progress)
+        if journal:
+            if result.ok:
+                journal.record(job, "done", strategy=job.strategy, media_seconds=result.media_seconds)
+            else:
+                journal.record(job, "failed", returncode=result.returncode, errors=result.errors)
+        if result.ok:
+            speed = result.media_seconds / result.wall_seconds if result.wall_seconds else 0.0
+            report(f"Converted ({job.strategy}): {job.input_file} -> {job.output_file} "
+                   f"({result.media_seconds:.0f}s audio in {result.wall_seconds:.1f}s, {speed:.0f}x)")
+        else:
+            report(f"FAILED ({result.returncode}): {job.input_file}")
+            for line in result.errors:
+                report(f"    {line}")
+        return result
+
+    def run_one(job):
+        # Any error in one file fails only that file, never the whole run
+        try:
+            return process(job)
+        except Exception as e:
+            result = JobResult(job, returncode=-1, errors=[f"{type(e).__name__}: {e}"])
+            report(f"FAILED: {job.input_file}")
+            report(f"    {result.errors[0]}")
+            if journal and not dry_run:
+                try:
+                    journal.record(job, "failed", returncode=result.returncode, errors=result.errors)
+                except OSError as journal_error:
+                    report(f"    could not write journal: {journal_error}")
+            return result
+
+    if dry_run:
+        print(f"{'strategy':<9} {'codec':<8} {'duration':>8}  input -> output")
+
+    counts = {"converted": 0, "skipped": 0, "failed": 0}
+    media = 0.0
+    submitted = {}          # future -> position of its job in jobs
+    rows = {}               # dry run: finished plan rows by position, until all before them are printed
+    next_row = 0
+
+    def collect(futures):
+        nonlocal media, next_row
+        for future in futures:
+            result = future.result()
+            position = submitted.pop(future)
+            if dry_run:
+                rows[position] = format_plan_row(result.job) if result.ok else None
+            if not result.ok:
+                counts["failed"] += 1
+            elif result.skipped:
+                counts["skipped"] += 1
+            else:
+                counts["converted"] += 1
+                media += result.media_seconds
+        while next_row in rows:
+            row = rows.pop(next_row)
+            next_row += 1
+            if row is not None:
+                report(row)
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = set()
+        for position, job in enumerate(jobs):
+            if len(pending) >= QUEUED_JOBS_PER_WORKER * max_workers:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+            future = executor.submit(run_one, job)
+            submitted[future] = position
+            pending.add(future)
+        collect(pending)
+    wall = time.monotonic() - start
+
+    if dry_run:
+        return counts
+
+    throughput = media / wall if wall > 0 else 0.0
+    print(f"\n{counts['converted']} converted, {counts['skipped']} skipped, {counts['failed']} failed, "
+          f"{max_workers} job(s) in parallel.")
+    print(f"Throughput: {media:.0f} media-seconds in {wall:.1f} wall-seconds "
+          f"= {throughput:.1f} media-s/wall-s")
+    return counts
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Create MP3 files from the MP4 files in a folder, "
+                    "or from a whole folder tree with --recursive."
+    )
+    parser.add_argument(
+        "input_folder",
+        nargs="?",
+        help="Folder with MP4 files (asked interactively if omitted).",
+    )
+    parser.add_argument(
+        "--output-root", "-o",
+        help="Write outputs below this folder, mirroring the input folder structure "
+             "(default: next to the input files).",
+    )
+    parser.add_argument(
+        "--recursive", "-r",
+        action="store_true",
+        help="Also convert files in all subfolders.",
+    )
+    parser.add_argument(
+        "--ext",
+        nargs="+",
+        default=[".mp4"],
+        help="File extensions to convert, case-insensitive (default: .mp4).",
+    )
+    parser.add_argument("--min-size", type=parse_size, help="Skip files smaller than this, e.g. 10M.")
+    parser.add_argument("--max-size", type=parse_size, help="Skip files larger than this, e.g. 4G.")
+    parser.add_argument("--newer-than", type=parse_date,
+                        help="Only convert files modified at or after this date, e.g. 2024-05-31.")
+    parser.add_argument("--older-than", type=parse_date,
+                        help="Only convert files modified before this date.")
+    parser.add_argument(
+        "--jobs", "-j",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of ffmpeg processes to run in parallel (default: number of CPUs).",
+    )
+    parser.add_argument(
+        "--policy",
+        choices=sorted(COPY_TARGETS),
+        default="mp3",
+        help="mp3: always write MP3, stream-copy only MP3 audio. "
+             "keep: additionally keep AAC audio as .m4a without re-encoding (default: mp3).",
+    )
+    parser.add_argument(
+        "--dry-run", "-n",
+        action="store_true",
+        help="Only print which strategy (copy/encode) would be used for each file.",
+    )
+    parser.add_argument(
+        "--journal",
+        help=f"Journal file recording the status of every file (default: {JOURNAL_NAME} in the output folder).",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="Existing outputs whose duration differs from the source by more than this many "
+             f"seconds are converted again (default: {DEFAULT_TOLERANCE}).",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    input_folder = args.input_folder
+    if input_folder is None:
+        print("This script will scan a given folder and create MP3 files in this folder based on the MP4 files in this folder. " +
+              "Audio that already is MP3 (or AAC with --policy keep) is copied without re-encoding. " +
+              "No input file will be deleted. If an output file already exists with the same name of an MP4 file, it will not be converted, " +
+              "unless it is shorter than the MP4 file (e.g. left over from an interrupted run).")
+        input_folder = input("Input folder: ")
+    output_folder = args.output_root or input_folder
+
+    # Create output folder if it doesn't exist (a dry run writes nothing)
+    if not args.dry_run and not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+
+    # Files are converted while the tree is still being walked
+    files = iter_media_files(
+        input_folder, args.ext, args.recursive,
+        args.min_size, args.max_size, args.newer_than, args.older_than,
+    )
+    jobs = iter_jobs(input_folder, output_folder, files)
+
+    journal = Journal(args.journal or os.path.join(output_folder, JOURNAL_NAME))
+    run_jobs(jobs, max(1, args.jobs), args.policy, args.dry_run, journal, args.tolerance)
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,53 @@
 #!/usr/bin/env python3
 import argparse
+import itertools
+import math
+import os
+import struct
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 import numpy as np
-from scipy.io import wavfile
+import scipy.fft
+from scipy.signal import lfilter
+
+
+BLOCK_SIZE = 1 << 18        # samples generated and written per block when streaming
+NOISE_RMS = 0.25            # RMS of all generated noise colors, peaks rarely exceed 1
+BROWN_CUTOFF_HZ = 5.0       # corner of the DC blocker that keeps the random walk bounded
+DECAY_FLOOR = 1e-40         # filter responses below this are treated as zero
+STREAM_BLOCK = 2048         # frames per write in --stream mode (~46 ms at 44.1 kHz)
+STREAM_LEAD = 0.25          # seconds of audio --stream mode stays ahead of real time
+UNBOUNDED_SIZE = 0xFFFFFFFF # WAV size field for streams of unknown length
+LOOP_CROSSFADE = 2.0        # seconds crossfaded at the seam of a --loop buffer
+SPECTRAL_OVERLAP = 4096     # frames crossfaded between blocks of the spectral engine
+SPECTRAL_FLOOR_HZ = BROWN_CUTOFF_HZ  # streamed 1/f^alpha shaping is flat below this
+SHAPE_CACHE_MAX = 1 << 20   # longest signal whose spectral shape is cached (~4 MB per shape)
+
+# Spectral exponent of each noise color: power density ~ 1 / f^alpha
+NOISE_ALPHAS = {"white": 0.0, "pink": 1.0, "brown": 2.0, "blue": -1.0, "violet": -2.0}
+
+# soundfile subtypes for compressed outputs, per --format
+COMPRESSED_SUBTYPES = {
+    ".flac": {"16": "PCM_16", "24": "PCM_24"},
+    ".ogg": {"16": "VORBIS", "24": "VORBIS", "f32": "VORBIS"},
+}
+
+# IIR approximation of a 1/f (pink) spectrum, within about 0.5 dB from
+# ~10 Hz to Nyquist at 44.1 kHz (three real poles/zeros, J.O. Smith III)
+PINK_B = [0.049922035, -0.095993537, 0.050612699, -0.004408786]
+PINK_A = [1.0, -2.494956002, 2.017265875, -0.522189400]
+
+# Output sample formats: (WAV format tag, bytes per sample, full-scale value)
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+SAMPLE_FORMATS = {
+    "16": (WAVE_FORMAT_PCM, 2, 32767),
+    "24": (WAVE_FORMAT_PCM, 3, 8388607),
+    "f32": (WAVE_FORMAT_IEEE_FLOAT, 4, 1.0),
+}
 
 
 def generate_tone_signal(frequency: float, duration: float, sample_rate: int) -> np.ndarray:
@@ -24,40 +70,541 @@ def generate_brown_noise(n_samples: int) -> np.ndarray:
     return brown
 
 
-def generate_pink_noise(n_samples: int, sample_rate: int) -> np.ndarray:
-    """Generate pink noise using 1/f frequency-domain shaping."""
-    white = np.random.randn(n_samples)
-    white_fft = np.fft.rfft(white)
-    freqs = np.fft.rfftfreq(n_samples, d=1 / sample_rate)
+def spectral_shape(n_samples: int, sample_rate: int, alpha: float, low_cut: float = None,
+                   high_cut: float = None, eq: tuple = (), floor_hz: float = 0.0) -> np.ndarray:
+    """
+    Amplitude factors per rfft bin for 1/f^alpha noise of n_samples samples.
+
+    The power density falls with 1/f^alpha (amplitude 1/f^(alpha/2)):
+    white=0, pink=1, brown=2, blue=-1, violet=-2. Below floor_hz the shape
+    stays flat. Bins outside [low_cut, high_cut] are zeroed. eq is a tuple
+    of (Hz, dB) points, interpolated over log frequency and held constant
+    beyond the first and last point. The DC bin is always zero.
+
+    The factors are normalized so that shaping unit-variance white noise
+    gives unit variance. Shapes of up to SHAPE_CACHE_MAX samples are
+    cached (and read-only), because block-wise generation asks for the
+    same shape over and over; longer ones would only fill memory.
+    """
+    if n_samples <= SHAPE_CACHE_MAX:
+        return _cached_spectral_shape(n_samples, sample_rate, alpha, low_cut, high_cut, eq, floor_hz)
+    return _spectral_shape(n_samples, sample_rate, alpha, low_cut, high_cut, eq, floor_hz)
+
+
+def _spectral_shape(n_samples, sample_rate, alpha, low_cut, high_cut, eq, floor_hz):
+    freqs = scipy.fft.rfftfreq(n_samples, d=1 / sample_rate)
+    shape = np.zeros_like(freqs)
+    if n_samples < 2:               # only the DC bin
+        shape.flags.writeable = False
+        return shape
+    f = np.maximum(freqs[1:], max(floor_hz, freqs[1]))
+    shape[1:] = f ** (-alpha / 2)
+
+    if low_cut is not None:
+        shape[freqs < low_cut] = 0.0
+    if high_cut is not None:
+        shape[freqs > high_cut] = 0.0
+    if eq:
+        points_hz, points_db = zip(*sorted(eq))
+        gain_db = np.interp(np.log2(freqs[1:]), np.log2(points_hz), points_db)
+        shape[1:] *= 10 ** (gain_db / 20)
+
+    # Every bin except DC and Nyquist stands for two bins of the full spectrum
+    weights = np.full_like(freqs, 2.0)
+    weights[0] = 1.0
+    if n_samples % 2 == 0:
+        weights[-1] = 1.0
+    power = np.sum(weights * shape * shape) / n_samples
+    if power > 0:
+        shape /= np.sqrt(power)
+    shape.flags.writeable = False
+    return shape
+
+
+_cached_spectral_shape = lru_cache(maxsize=16)(_spectral_shape)
 
-    # 1/sqrt(f) scaling, ignore DC
-    scale = np.ones_like(freqs)
-    scale[1:] = 1 / np.sqrt(freqs[1:])
-    pink_fft = white_fft * scale
 
-    pink = np.fft.irfft(pink_fft, n_samples)
+def generate_colored_noise(n_samples: int, sample_rate: int, alpha: float,
+                           rng: np.random.Generator = None, channels: int = 1,
+                           workers: int = -1, **shape_options) -> np.ndarray:
+    """
+    Generate (n_samples, channels) of 1/f^alpha noise with unit variance.
+
+    White noise is shaped in the frequency domain with spectral_shape();
+    shape_options are passed on to it. The FFTs run on `workers` threads
+    (scipy.fft, -1 means all CPUs).
+    """
+    if n_samples < 2:               # no frequency but DC, which is always zero
+        return np.zeros((n_samples, channels))
+    rng = rng or np.random.default_rng()
+    white = rng.standard_normal((n_samples, channels))
+    spectrum = scipy.fft.rfft(white, axis=0, workers=workers)
+    spectrum *= spectral_shape(n_samples, sample_rate, alpha, **shape_options)[:, None]
+    return scipy.fft.irfft(spectrum, n_samples, axis=0, workers=workers)
+
+
+def generate_pink_noise(n_samples: int, sample_rate: int) -> np.ndarray:
+    """Generate pink noise using 1/f frequency-domain shaping."""
+    if n_samples < 2:
+        return np.zeros(n_samples)
+    pink = generate_colored_noise(n_samples, sample_rate, 1.0)[:, 0]
     pink -= pink.mean()
     pink /= np.max(np.abs(pink))            # normalize to [-1, 1]
     return pink
 
 
+class ToneSource:
+    """Sine tone in consecutive blocks, phase continuous across blocks."""
+
+    def __init__(self, frequency: float, sample_rate: int, channels: int = 1):
+        self.frequency = frequency
+        self.sample_rate = sample_rate
+        self.channels = channels
+
+    def render(self, start: int, n: int, seed: np.random.SeedSequence):
+        t = (start + np.arange(n)) / self.sample_rate
+        tone = np.sin(2 * np.pi * self.frequency * t)
+        return np.repeat(tone[:, None], self.channels, axis=1)
+
+    def stitch(self, rendered):
+        return rendered
+
+
+class WhiteSource:
+    """White noise (Gaussian, NOISE_RMS) in consecutive blocks, independent per channel."""
+
+    def __init__(self, channels: int = 1):
+        self.channels = channels
+
+    def render(self, start: int, n: int, seed: np.random.SeedSequence):
+        return NOISE_RMS * np.random.default_rng(seed).standard_normal((n, self.channels))
+
+    def stitch(self, rendered):
+        return rendered
+
+
+class FilteredNoiseSource:
+    """
+    White noise through an IIR filter, in consecutive blocks.
+
+    render() filters one block starting from a zero filter state and can
+    run in a worker process. stitch() runs in order in the main process
+    and adds the response of the filter state left by the previous block
+    (the filter is linear, so zero-state + zero-input response is exactly
+    the same as filtering one long signal). The output is scaled to
+    NOISE_RMS using the energy of the filter's impulse response, which
+    unlike normalizing by the peak does not need the whole signal.
+    Every channel filters its own white noise, so channels are decorrelated.
+    """
+
+    def __init__(self, b, a, channels: int = 1):
+        self.b = np.asarray(b, dtype=float)
+        self.a = np.asarray(a, dtype=float)
+        self.channels = channels
+        self.zi = np.zeros((max(len(self.a), len(self.b)) - 1, channels))
+
+        # Number of samples until the slowest pole has decayed to
+        # DECAY_FLOOR. Filtering further would only produce denormal
+        # numbers, which are extremely slow to compute with.
+        radius = np.max(np.abs(np.roots(self.a)))
+        self.decay_length = int(np.ceil(np.log(DECAY_FLOOR) / np.log(radius)))
+
+        impulse = np.zeros(self.decay_length)
+        impulse[0] = 1.0
+        h = lfilter(self.b, self.a, impulse)
+        self.gain = NOISE_RMS / np.sqrt(np.sum(h * h))
+
+    def render(self, start: int, n: int, seed: np.random.SeedSequence):
+        white = np.random.default_rng(seed).standard_normal((n, self.channels))
+        return lfilter(self.b, self.a, white, axis=0, zi=np.zeros_like(self.zi))
+
+    def stitch(self, rendered):
+        out, zf = rendered
+        n = min(len(out), self.decay_length)
+        carried, carried_zf = lfilter(self.b, self.a, np.zeros((n, self.channels)), axis=0, zi=self.zi)
+        out[:n] += carried
+        self.zi = zf + carried_zf if n == len(out) else zf
+        out *= self.gain
+        return out
+
+
+class SpectralNoiseSource:
+    """
+    1/f^alpha noise from the frequency domain, in consecutive blocks.
+
+    render() makes each block with generate_colored_noise(), independent of
+    all others, plus SPECTRAL_OVERLAP extra frames. stitch() crossfades
+    those extra frames of the previous block into the head of the next one
+    (equal-power, so the level stays constant). All full blocks have the
+    same length, so the shaping vector comes from the cache.
+    """
+
+    def __init__(self, sample_rate: int, alpha: float, channels: int = 1,
+                 workers: int = -1, **shape_options):
+        self.sample_rate = sample_rate
+        self.alpha = alpha
+        self.channels = channels
+        self.workers = workers
+        self.shape_options = shape_options
+        self.tail = None
+
+        t = (np.arange(SPECTRAL_OVERLAP) + 0.5) / SPECTRAL_OVERLAP
+        self.fade_in = np.sin(0.5 * np.pi * t)[:, None]
+        self.fade_out = np.cos(0.5 * np.pi * t)[:, None]
+
+    def render(self, start: int, n: int, seed: np.random.SeedSequence):
+        noise = generate_colored_noise(
+            n + SPECTRAL_OVERLAP, self.sample_rate, self.alpha, np.random.default_rng(seed),
+            self.channels, self.workers, floor_hz=SPECTRAL_FLOOR_HZ, **self.shape_options,
+        )
+        noise *= NOISE_RMS
+        return noise
+
+    def stitch(self, rendered):
+        out, tail = rendered[:-SPECTRAL_OVERLAP], rendered[-SPECTRAL_OVERLAP:]
+        if self.tail is not None:
+            m = min(len(out), SPECTRAL_OVERLAP)
+            out[:m] = out[:m] * self.fade_in[:m] + self.tail[:m] * self.fade_out[:m]
+        self.tail = tail
+        return out
+
+
+def brown_filter(sample_rate: int):
+    """
+    Filter coefficients for streamed brown noise.
+
+    A random walk (integrator 1 / (1 - z^-1)) followed by a one-pole DC
+    blocker (1 - z^-1) / (1 - R z^-1) reduces to the leaky integrator
+    1 / (1 - R z^-1): 1/f^2 above BROWN_CUTOFF_HZ, but bounded, so it can
+    run forever without drifting away.
+    """
+    r = np.exp(-2 * np.pi * BROWN_CUTOFF_HZ / sample_rate)
+    return [1.0], [1.0, -r]
+
+
+def make_source(mode: str, frequency: float, sample_rate: int, channels: int = 1,
+                alpha: float = None, workers: int = -1, **shape_options):
+    """
+    Return the block source for a mode, see iter_blocks().
+
+    white, pink and brown noise come from IIR filters. The spectral engine
+    is used for blue, violet and color (any alpha) noise, and for every
+    noise color as soon as shape_options (band limits, EQ) are given.
+    """
+    if mode in ("blue", "violet", "color") or (mode != "tone" and shape_options):
+        if alpha is None:
+            alpha = NOISE_ALPHAS.get(mode, 1.0)
+        return SpectralNoiseSource(sample_rate, alpha, channels, workers, **shape_options)
+    if mode == "tone":
+        return ToneSource(frequency, sample_rate, channels)
+    if mode == "white":
+        return WhiteSource(channels)
+    if mode == "pink":
+        return FilteredNoiseSource(PINK_B, PINK_A, channels)
+    if mode == "brown":
+        return FilteredNoiseSource(*brown_filter(sample_rate), channels)
+    raise ValueError(f"Unknown mode: {mode}")
+
+
+def iter_blocks(source, n_samples, seed: np.random.SeedSequence = None,
+                jobs: int = 1, block_size: int = BLOCK_SIZE):
+    """
+    Yield n_samples frames from source in blocks of at most block_size.
+
+    Blocks have the shape (frames, channels). With n_samples=None the
+    blocks never end.
+
+    Block i is rendered with the i-th child of seed (SeedSequence.spawn),
+    so its random numbers depend only on the seed and its position. Blocks
+    are rendered by up to `jobs` worker processes and stitched together in
+    order here, which makes the output bit-identical for a given seed no
+    matter how many workers are used. At most 2 * jobs blocks are in
+    flight, so memory use does not depend on n_samples.
+    """
+    seed = seed if seed is not None else np.random.SeedSequence()
+
+    def tasks():
+        starts = itertools.count(0, block_size) if n_samples is None else range(0, n_samples, block_size)
+        for start in starts:
+            n = block_size if n_samples is None else min(block_size, n_samples - start)
+            yield start, n, seed.spawn(1)[0]
+
+    if jobs <= 1:
+        for task in tasks():
+            yield source.stitch(source.render(*task))
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = deque()
+        for task in tasks():
+            pending.append(executor.submit(source.render, *task))
+            if len(pending) >= 2 * jobs:
+                yield source.stitch(pending.popleft().result())
+        while pending:
+            yield source.stitch(pending.popleft().result())
+
+
+class OutputStage:
+    """
+    Convert float blocks to WAV sample data without per-block allocations.
+
+    Volume, clipping and scaling run in place on one float32 work buffer
+    through the out= argument of the ufuncs. The integer/byte buffers are
+    allocated once and reused, so converting a block costs no memory
+    beyond the buffers, however long the signal is.
+    """
+
+    def __init__(self, sample_format: str = "16", volume: float = 0.5):
+        self.format_tag, self.sample_width, self.full_scale = SAMPLE_FORMATS[sample_format]
+        self.volume = volume
+        self._size = 0
+
+    def _buffers(self, size: int):
+        if size > self._size:
+            self._size = size
+            self._work = np.empty(size, dtype=np.float32)
+            if self.sample_width == 2:
+                self._pcm = np.empty(size, dtype="<i2")
+            elif self.sample_width == 3:
+                self._pcm = np.empty(size, dtype="<i4")
+                self._packed = np.empty((size, 3), dtype=np.uint8)
+        return self._work[:size]
+
+    def scale(self, block: np.ndarray) -> np.ndarray:
+        """Apply volume and clip to [-1, 1]; returns the flat float32 work buffer."""
+        work = self._buffers(block.size)
+        np.multiply(block.reshape(-1), self.volume, out=work, casting="same_kind")
+        np.nan_to_num(work, copy=False)
+        np.clip(work, -1.0, 1.0, out=work)
+        return work
+
+    def convert(self, block: np.ndarray) -> memoryview:
+        """Return the little-endian sample bytes of a (frames, channels) block."""
+        size = block.size
+        work = self.scale(block)
+        if self.format_tag == WAVE_FORMAT_IEEE_FLOAT:
+            return memoryview(work.astype("<f4", copy=False)).cast("B")
+
+        np.multiply(work, self.full_scale, out=work)
+        pcm = self._pcm[:size]
+        np.copyto(pcm, work, casting="unsafe")      # truncates like astype()
+        if self.sample_width == 3:
+            # keep the three low bytes of each little-endian int32
+            packed = self._packed[:size]
+            np.copyto(packed, pcm.view(np.uint8).reshape(size, 4)[:, :3])
+            return memoryview(packed).cast("B")
+        return memoryview(pcm).cast("B")
+
+
+def wav_header(sample_rate: int, channels: int, sample_format: str, data_bytes) -> bytes:
+    """
+    WAV header for data_bytes bytes of sample data.
+
+    With data_bytes=None all size fields are set to 0xFFFFFFFF, which
+    players like aplay and ffplay read as "until the end of the stream".
+    """
+    format_tag, sample_width, _ = SAMPLE_FORMATS[sample_format]
+    block_align = channels * sample_width
+    fmt = struct.pack("<HHIIHH", format_tag, channels, sample_rate,
+                      sample_rate * block_align, block_align, 8 * sample_width)
+
+    def size(value):
+        return struct.pack("<I", UNBOUNDED_SIZE if data_bytes is None else min(value, UNBOUNDED_SIZE))
+
+    chunks = []
+    if format_tag == WAVE_FORMAT_PCM:
+        chunks.append(b"fmt " + struct.pack("<I", len(fmt)) + fmt)
+    else:
+        # non-PCM formats need the cbSize field and a fact chunk
+        fmt += struct.pack("<H", 0)
+        chunks.append(b"fmt " + struct.pack("<I", len(fmt)) + fmt)
+        frames = (data_bytes or 0) // block_align
+        chunks.append(b"fact" + struct.pack("<I", 4) + size(frames))
+    chunks.append(b"data" + size(data_bytes))
+
+    body = b"WAVE" + b"".join(chunks)
+    return b"RIFF" + size(len(body) + (data_bytes or 0)) + body
+
+
+class WavStreamWriter:
+    """
+    Write a PCM or float WAV file block by block.
+
+    The header is written with placeholder sizes first and patched on
+    close(), so the total length does not need to be known in advance.
+    """
+
+    def __init__(self, filename: str, sample_rate: int, channels: int = 1,
+                 sample_format: str = "16"):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_format = sample_format
+        self.data_bytes = 0
+        self.file = open(filename, "wb")
+        self.file.write(wav_header(sample_rate, channels, sample_format, 0))
+
+    def write(self, data) -> None:
+        self.file.write(data)
+        self.data_bytes += len(data)
+
+    def close(self) -> None:
+        self.file.seek(0)
+        self.file.write(wav_header(self.sample_rate, self.channels, self.sample_format, self.data_bytes))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_wav_stream(filename: str, blocks, sample_rate: int = 44100, volume: float = 0.5,
+                     channels: int = 1, sample_format: str = "16") -> None:
+    """Scale float (frames, channels) blocks and write them incrementally as a WAV file."""
+    stage = OutputStage(sample_format, volume)
+    with WavStreamWriter(filename, sample_rate, channels, sample_format) as writer:
+        for block in blocks:
+            writer.write(stage.convert(block))
+
+
+def write_compressed_stream(filename: str, blocks, sample_rate: int = 44100, volume: float = 0.5,
+                            channels: int = 1, sample_format: str = "16") -> None:
+    """Write float (frames, channels) blocks incrementally as FLAC or Ogg Vorbis."""
+    try:
+        import soundfile
+    except ImportError:
+        raise SystemExit("FLAC/Ogg output needs the soundfile package (pip install soundfile).")
+
+    extension = os.path.splitext(filename)[1].lower()
+    subtype = COMPRESSED_SUBTYPES[extension].get(sample_format)
+    if subtype is None:
+        raise SystemExit(f"--format {sample_format} is not supported for {extension} files.")
+
+    stage = OutputStage(sample_format, volume)
+    with soundfile.SoundFile(filename, "w", samplerate=sample_rate, channels=channels,
+                             subtype=subtype) as out:
+        for block in blocks:
+            out.write(stage.scale(block).reshape(-1, channels))
+
+
+def write_audio_file(filename: str, blocks, sample_rate: int = 44100, volume: float = 0.5,
+                     channels: int = 1, sample_format: str = "16") -> None:
+    """Write blocks as WAV, or compressed if filename ends in .flac or .ogg."""
+    extension = os.path.splitext(filename)[1].lower()
+    write = write_compressed_stream if extension in COMPRESSED_SUBTYPES else write_wav_stream
+    write(filename, blocks, sample_rate, volume, channels, sample_format)
+
+
+def render_loop(source, loop_frames: int, fade_frames: int, seed: np.random.SeedSequence = None,
+                jobs: int = 1) -> np.ndarray:
+    """
+    Render a (loop_frames, channels) float32 buffer that repeats without a seam.
+
+    fade_frames more frames than needed are generated. The extra tail is
+    crossfaded into the head of the loop with an equal-power (sin/cos)
+    fade, which keeps the level of uncorrelated noise constant. Playing
+    the loop repeatedly then goes from the last frame straight into what
+    the generator would have produced next, so the seam has the same
+    spectrum as any other point in the noise.
+    """
+    total = loop_frames + fade_frames
+    buffer = np.empty((total, source.channels), dtype=np.float32)
+    position = 0
+    for block in iter_blocks(source, total, seed, jobs):
+        buffer[position:position + len(block)] = block
+        position += len(block)
+
+    loop = buffer[:loop_frames]
+    if fade_frames:
+        t = (np.arange(fade_frames, dtype=np.float32) + 0.5) / fade_frames
+        fade_in = np.sin(0.5 * np.pi * t)[:, None]
+        fade_out = np.cos(0.5 * np.pi * t)[:, None]
+        tail = buffer[loop_frames:]
+        loop[:fade_frames] = loop[:fade_frames] * fade_in + tail * fade_out
+    return loop
+
+
+def iter_loop(loop: np.ndarray, n_samples: int, block_size: int = BLOCK_SIZE):
+    """Yield n_samples frames by repeating loop, in blocks of at most block_size."""
+    position = 0
+    while n_samples > 0:
+        n = min(block_size, n_samples, len(loop) - position)
+        yield loop[position:position + n]
+        position = (position + n) % len(loop)
+        n_samples -= n
+
+
+def stream_to_stdout(blocks, sample_rate: int = 44100, volume: float = 0.5,
+                     channels: int = 1, sample_format: str = "16", raw: bool = False) -> None:
+    """
+    Write blocks to stdout in real time, for piping into aplay or ffplay.
+
+    Output goes out in STREAM_BLOCK pieces and is paced against a fixed
+    start time, staying STREAM_LEAD seconds ahead of real time. Sleeping
+    until an absolute deadline (instead of a fixed interval per write)
+    means timing errors never add up, so the rate does not drift however
+    long it plays. Unless raw is set, a WAV header with unbounded length
+    comes first.
+    """
+    out = sys.stdout.buffer
+    stage = OutputStage(sample_format, volume)
+    try:
+        if not raw:
+            out.write(wav_header(sample_rate, channels, sample_format, None))
+        start = time.monotonic()
+        frames_written = 0
+        for block in blocks:
+            for i in range(0, len(block), STREAM_BLOCK):
+                piece = block[i:i + STREAM_BLOCK]
+                out.write(stage.convert(piece))
+                out.flush()
+                frames_written += len(piece)
+                ahead = frames_written / sample_rate - (time.monotonic() - start)
+                if ahead > STREAM_LEAD:
+                    time.sleep(ahead - STREAM_LEAD)
+    except BrokenPipeError:
+        # The player quit. Point stdout at devnull so that Python's final
+        # flush at exit does not raise a second BrokenPipeError.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), out.fileno())
+
+
 def write_wav_from_signal(filename: str, signal: np.ndarray,
-                          sample_rate: int = 44100, volume: float = 0.5) -> None:
-    """Scale a signal to 16‑bit PCM and write it as a mono WAV file."""
-    # Ensure finite values
-    signal = np.nan_to_num(signal)
+                          sample_rate: int = 44100, volume: float = 0.5,
+                          sample_format: str = "16") -> None:
+    """
+    Scale a signal to PCM/float samples and write it as a WAV file.
 
-    # Apply volume and clip to [-1, 1]
-    signal = np.clip(signal * volume, -1.0, 1.0)
+    signal has the shape (frames,) for mono or (frames, channels). It is
+    converted in BLOCK_SIZE slices, so no full-length copy is made.
+    """
+    frames = signal.reshape(len(signal), -1)
+    blocks = (frames[i:i + BLOCK_SIZE] for i in range(0, len(frames), BLOCK_SIZE))
+    write_wav_stream(filename, blocks, sample_rate, volume, frames.shape[1], sample_format)
 
-    # Convert to 16‑bit PCM
-    signal_int16 = (signal * 32767).astype(np.int16)
-    wavfile.write(filename, sample_rate, signal_int16)
+
+def parse_eq(text: str) -> tuple:
+    """Parse an EQ curve like "60:+3,1000:0,8000:-6" into ((Hz, dB), ...)."""
+    points = []
+    for point in text.split(","):
+        try:
+            hz, db = point.split(":")
+            points.append((float(hz), float(db)))
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid EQ point {point!r}, expected HZ:DB")
+        if points[-1][0] <= 0:
+            raise argparse.ArgumentTypeError(f"EQ frequency must be positive: {point!r}")
+    return tuple(points)
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
-        description="Generate tone or colored noise WAV for sleep."
+        description="Generate tone or colored noise WAV for sleep.",
+        epilog="Endless playback:\n"
+               "  python noise_generator.py 0 inf --mode pink --stream | aplay\n"
+               "  python noise_generator.py 0 inf --mode brown --stream --raw | "
+               "ffplay -nodisp -f s16le -ar 44100 -ac 1 -",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
     )
     parser.add_argument(
         "frequency",
@@ -67,19 +614,50 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "duration",
         type=float,
-        help="Duration in seconds."
+        help="Duration in seconds (inf plays forever with --stream)."
     )
     parser.add_argument(
         "output",
         type=str,
-        help="Output WAV filename (e.g. sleep.wav)."
+        nargs="?",
+        help="Output filename (e.g. sleep.wav); .flac and .ogg are written compressed. "
+             "Not used with --stream."
     )
     parser.add_argument(
         "--mode",
         "-m",
-        choices=["tone", "white", "pink", "brown"],
+        choices=["tone", "white", "pink", "brown", "blue", "violet", "color"],
         default="tone",
-        help="What to generate: tone, white, pink, or brown (default: tone)."
+        help="What to generate: tone, a noise color, or color noise with --alpha (default: tone)."
+    )
+    parser.add_argument(
+        "--alpha",
+        "-a",
+        type=float,
+        default=None,
+        help="Spectral exponent for --mode color, power ~ 1/f^alpha: "
+             "white=0, pink=1, brown=2, blue=-1, violet=-2 (default: 1)."
+    )
+    parser.add_argument(
+        "--low-cut",
+        type=float,
+        default=None,
+        metavar="HZ",
+        help="Remove noise below this frequency."
+    )
+    parser.add_argument(
+        "--high-cut",
+        type=float,
+        default=None,
+        metavar="HZ",
+        help="Remove noise above this frequency."
+    )
+    parser.add_argument(
+        "--eq",
+        type=parse_eq,
+        default=(),
+        metavar="HZ:DB,...",
+        help="EQ curve for noise, e.g. 60:+3,1000:0,8000:-6 (interpolated over log frequency)."
     )
     parser.add_argument(
         "--sample-rate",
@@ -95,29 +673,140 @@ def parse_args() -> argparse.Namespace:
         default=0.5,
         help="Volume from 0.0 to 1.0 (default: 0.5)."
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--format",
+        "-f",
+        choices=list(SAMPLE_FORMATS),
+        default="16",
+        help="Sample format: 16 or 24 bit PCM, or f32 for 32-bit float (default: 16)."
+    )
+    parser.add_argument(
+        "--channels",
+        "-c",
+        type=int,
+        choices=[1, 2],
+        default=1,
+        help="1 for mono, 2 for stereo with independent noise per channel (default: 1)."
+    )
+    parser.add_argument(
+        "--seed",
+        "-s",
+        type=int,
+        default=None,
+        help="Random seed; the same seed always gives the same output (default: random, printed)."
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes generating blocks (default: number of CPUs)."
+    )
+    parser.add_argument(
+        "--loop",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="Render a seamless loop of this length and build the output by repeating it."
+    )
+    parser.add_argument(
+        "--loop-only",
+        action="store_true",
+        help="With --loop: write just the loop itself instead of the full duration."
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Write audio to stdout in real time instead of to a file."
+    )
+    parser.add_argument(
+        "--raw",
+        action="store_true",
+        help="With --stream: write bare PCM samples without a WAV header."
+    )
+    args = parser.parse_args()
+    if args.output is None and not args.stream:
+        parser.error("an output filename is required unless --stream is used")
+    if math.isinf(args.duration) and not args.stream:
+        parser.error("an infinite duration is only possible with --stream")
+    if args.output and not args.stream:
+        extension = os.path.splitext(args.output)[1].lower()
+        if extension not in COMPRESSED_SUBTYPES and extension != ".wav":
+            parser.error("the output file must end in .wav, .flac or .ogg")
+    if args.loop is not None and args.loop <= 0:
+        parser.error("--loop must be a positive number of seconds")
+    if args.loop_only and args.loop is None:
+        parser.error("--loop-only requires --loop")
+    if args.alpha is not None and args.mode != "color":
+        parser.error("--alpha is only used with --mode color")
+    if args.raw and not args.stream:
+        parser.error("--raw is only used with --stream")
+    return args
 
 
 def main() -> None:
     args = parse_args()
-    n_samples = int(args.sample_rate * args.duration)
-
-    if args.mode == "tone":
-        signal = generate_tone_signal(args.frequency, args.duration, args.sample_rate)
-    elif args.mode == "white":
-        signal = generate_white_noise(n_samples)
-    elif args.mode == "pink":
-        signal = generate_pink_noise(n_samples, args.sample_rate)
-    elif args.mode == "brown":
-        signal = generate_brown_noise(n_samples)
+    n_samples = None if math.isinf(args.duration) else int(args.sample_rate * args.duration)
+
+    # Generate and write block by block, so memory use does not depend on
+    # the duration (an 8 h track would need several copies of 1.2 billion
+    # samples otherwise).
+    seed = np.random.SeedSequence(args.seed)
+    if args.seed is None and args.mode != "tone":
+        # stderr, because stdout may carry the audio
+        print(f"Seed: {seed.entropy}", file=sys.stderr)
+    shape_options = {}
+    if args.low_cut is not None:
+        shape_options["low_cut"] = args.low_cut
+    if args.high_cut is not None:
+        shape_options["high_cut"] = args.high_cut
+    if args.eq:
+        shape_options["eq"] = args.eq
+    # One process: let the FFTs use all cores. Several: one thread each.
+    fft_workers = -1 if args.jobs <= 1 else 1
+
+    if args.loop is None:
+        source = make_source(args.mode, args.frequency, args.sample_rate, args.channels,
+                             args.alpha, fft_workers, **shape_options)
+        blocks = iter_blocks(source, n_samples, seed, args.jobs)
     else:
-        raise ValueError(f"Unknown mode: {args.mode}")
+        loop_frames = max(1, int(args.sample_rate * args.loop))
+        frequency = args.frequency
+        fade_frames = min(loop_frames, int(args.sample_rate * LOOP_CROSSFADE))
+        if args.mode == "tone":
+            # A tone loops seamlessly if it has a whole number of periods in
+            # the loop; crossfading two phases of it would cause cancellation.
+            periods = max(1, round(frequency * loop_frames / args.sample_rate))
+            frequency = periods * args.sample_rate / loop_frames
+            fade_frames = 0
+            if frequency != args.frequency:
+                print(f"Tone adjusted to {frequency:.4f} Hz to fit the loop.", file=sys.stderr)
+        source = make_source(args.mode, frequency, args.sample_rate, args.channels,
+                             args.alpha, fft_workers, **shape_options)
+        loop = render_loop(source, loop_frames, fade_frames, seed, args.jobs)
+        if args.loop_only:
+            n_samples = loop_frames
+        blocks = iter_loop(loop, n_samples) if n_samples is not None else itertools.chain.from_iterable(
+            iter_loop(loop, loop_frames) for _ in itertools.count())
+
+    if args.stream:
+        stream_to_stdout(
+            blocks=blocks,
+            sample_rate=args.sample_rate,
+            volume=args.volume,
+            channels=args.channels,
+            sample_format=args.format,
+            raw=args.raw,
+        )
+        return
 
-    write_wav_from_signal(
+    write_audio_file(
         filename=args.output,
-        signal=signal,
+        blocks=blocks,
         sample_rate=args.sample_rate,
         volume=args.volume,
+        channels=args.channels,
+        sample_format=args.format,
     )
 
 
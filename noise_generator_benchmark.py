@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Benchmark the generators and writers of noise_generator.py.
+
+Every (case, duration, sample rate) combination runs in a fresh Python
+process, so the peak RSS of one case does not hide the next one. For each
+run, wall time, samples per second and peak RSS are recorded. All results
+are written to a JSON file, so runs on different versions or machines can
+be compared.
+
+Cases:
+    tone, white, pink, brown   the in-memory generate_* functions
+    write                      write_wav_from_signal on a ready-made signal
+    stream-<mode>              block-wise generation + WAV writing (main's path)
+
+The default grid runs the in-memory cases only up to 1 h; their 8 h runs
+need tens of GB. Ask for them with --durations, best with --memory-limit.
+
+Example:
+    python noise_generator_benchmark.py --durations 1 60 3600 --rates 44100 \
+        --output bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Durations from 1 s up to an 8 h sleep track
+DEFAULT_DURATIONS = [1, 10, 60, 600, 3600, 8 * 3600]
+# Longest default duration of the in-memory cases: 8 h would be a >1G-point
+# FFT needing tens of GB. Pass --durations to run them anyway.
+DEFAULT_IN_MEMORY_MAX = 3600
+DEFAULT_RATES = [44100, 48000]
+IN_MEMORY_CASES = ["tone", "white", "pink", "brown", "write"]
+STREAM_CASES = ["stream-tone", "stream-white", "stream-pink", "stream-brown"]
+ALL_CASES = IN_MEMORY_CASES + STREAM_CASES
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux, but in bytes on macOS
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def run_case(case: str, duration: float, sample_rate: int) -> dict:
+    """Run one case in this process and return its measurements."""
+    import numpy as np
+    import noise_generator as ng
+
+    n_samples = int(sample_rate * duration)
+    baseline = peak_rss_mb()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "out.wav")
+
+        if case == "write":
+            signal = np.random.default_rng(0).standard_normal(n_samples)
+            start = time.perf_counter()
+            ng.write_wav_from_signal(output, signal, sample_rate)
+        elif case.startswith("stream-"):
+            mode = case.removeprefix("stream-")
+            start = time.perf_counter()
+            source = ng.make_source(mode, 440.0, sample_rate)
+            blocks = ng.iter_blocks(source, n_samples, np.random.SeedSequence(0))
+            ng.write_wav_stream(output, blocks, sample_rate)
+        else:
+            start = time.perf_counter()
+            if case == "tone":
+                ng.generate_tone_signal(440.0, duration, sample_rate)
+            elif case == "white":
+                ng.generate_white_noise(n_samples)
+            elif case == "pink":
+                ng.generate_pink_noise(n_samples, sample_rate)
+            elif case == "brown":
+                ng.generate_brown_noise(n_samples)
+            else:
+                raise ValueError(f"Unknown case: {case}")
+        wall = time.perf_counter() - start
+
+    return {
+        "wall_seconds": wall,
+        "samples_per_second": n_samples / wall if wall > 0 else None,
+        "baseline_rss_mb": baseline,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_isolated(case: str, duration: float, sample_rate: int,
+                 timeout: float = None, memory_limit_mb: int = None) -> dict:
+    """Run one case in a child process; failures are recorded, not raised."""
+    result = {
+        "case": case,
+        "duration": duration,
+        "sample_rate": sample_rate,
+        "samples": int(sample_rate * duration),
+        "error": None,
+    }
+
+    def limit_memory():
+        limit = memory_limit_mb * 2**20
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    command = [sys.executable, os.path.abspath(__file__),
+               "--run-case", case, str(duration), str(sample_rate)]
+    try:
+        completed = subprocess.run(
+            command, capture_output=True, text=True, timeout=timeout,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            preexec_fn=limit_memory if memory_limit_mb else None,
+        )
+    except subprocess.TimeoutExpired:
+        result["error"] = f"timeout after {timeout} s"
+        return result
+
+    if completed.returncode != 0:
+        lines = completed.stderr.strip().splitlines()
+        reason = lines[-1] if lines else f"killed by signal {-completed.returncode}"
+        result["error"] = reason
+        return result
+
+    result.update(json.loads(completed.stdout))
+    return result
+
+
+def format_row(result: dict) -> str:
+    head = f"{result['case']:<13} {result['duration']:>8g}s {result['sample_rate']:>6} Hz"
+    if result["error"]:
+        return f"{head}  FAILED: {result['error']}"
+    return (f"{head}  {result['wall_seconds']:>9.3f}s  "
+            f"{result['samples_per_second'] / 1e6:>8.1f} Msamples/s  "
+            f"peak {result['peak_rss_mb']:>8.0f} MiB")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark noise_generator.py over a grid of durations and sample rates."
+    )
+    parser.add_argument(
+        "--cases",
+        nargs="+",
+        choices=ALL_CASES,
+        default=ALL_CASES,
+        help="Cases to run (default: all)."
+    )
+    parser.add_argument(
+        "--durations",
+        nargs="+",
+        type=float,
+        help=f"Durations in seconds (default: {' '.join(map(str, DEFAULT_DURATIONS))}, "
+             f"in-memory cases only up to {DEFAULT_IN_MEMORY_MAX})."
+    )
+    parser.add_argument(
+        "--rates",
+        nargs="+",
+        type=int,
+        default=DEFAULT_RATES,
+        help=f"Sample rates in Hz (default: {' '.join(map(str, DEFAULT_RATES))})."
+    )
+    parser.add_argument(
+        "--output",
+        "-o",
+        default="noise_generator_benchmark.json",
+        help="JSON file for the results (default: noise_generator_benchmark.json)."
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=None,
+        help="Give up on a single run after this many seconds."
+    )
+    parser.add_argument(
+        "--memory-limit",
+        type=int,
+        default=None,
+        metavar="MB",
+        help="Address space limit per run, so in-memory cases fail cleanly instead of swapping."
+    )
+    parser.add_argument(
+        "--run-case",
+        nargs=3,
+        metavar=("CASE", "DURATION", "RATE"),
+        help=argparse.SUPPRESS,     # used internally for the child processes
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+
+    if args.run_case:
+        case, duration, sample_rate = args.run_case
+        print(json.dumps(run_case(case, float(duration), int(sample_rate))))
+        return
+
+    import numpy as np
+    import scipy
+
+    durations = args.durations or DEFAULT_DURATIONS
+    results = []
+    for sample_rate in args.rates:
+        for duration in durations:
+            for case in args.cases:
+                if args.durations is None and case in IN_MEMORY_CASES and duration > DEFAULT_IN_MEMORY_MAX:
+                    continue
+                result = run_isolated(case, duration, sample_rate, args.timeout, args.memory_limit)
+                print(format_row(result), flush=True)
+                results.append(result)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,58 @@
+import argparse
+import hashlib
+import json
 import os
 import re
 import shutil
+import struct
+import sys
+import time
+import unicodedata
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from difflib import SequenceMatcher
 from mutagen import File
 
 # ================= CONFIG =================
-MUSIC_DIR = r"/home/mint/Desktop/Monstercat/catalog"
-REMOVED_DIR = r"/home/mint/Desktop/Monstercat/catalog_duplicates"
-DRY_RUN = False   # <-- set False to actually move files
+# Music folder, removed folder and dry-run are command line arguments, see --help
+CONTENT_MATCH = True   # also group files whose audio data is identical, whatever their names
+EXACT_MATCH = True     # also group byte-identical files (cheap: size, then partial, then full hash)
+HASH_WORKERS = os.cpu_count()
+TAG_WORKERS = 16       # threads reading tags (slow on network shares, so many)
+TAG_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "remove_duplicate_songs", "tags.json")
+FUZZY_THRESHOLD = 0.9  # similarity (0..1) above which normalized titles count as the same song
 # ==========================================
 
-os.makedirs(REMOVED_DIR, exist_ok=True)
+AUDIO_EXTENSIONS = (".mp3", ".flac", ".wav", ".m4a")
+HASH_CHUNK_SIZE = 1024 * 1024
+PARTIAL_HASH_SIZE = 64 * 1024   # bytes hashed at the start and at the end of a file
+IO_WORKERS = 16                 # threads for the byte-identical pipeline (I/O bound)
+MOVE_BATCH = 256                # moves per undo journal sync
+COMMANDS = ("run", "plan", "apply", "undo")
+PLAN_FILE = "duplicates.plan.json"
+UNDO_JOURNAL = "undo.jsonl"
 
 DUPLICATE_PATTERN = re.compile(r"\s*\(\d+\)\s*$")
 PAREN_CONTENT_PATTERN = re.compile(r"\s*\([^)]*\)")
 
+# Fuzzy title matching
+DASH_PATTERN = re.compile(r"[\u2010-\u2015\u2212\ufe58\ufe63\uff0d]")
+FEAT_PATTERN = re.compile(r"\b(?:featuring|feat|ft)\b\.?")
+NOISE_PATTERN = re.compile(
+    r"[(\[][^)\]]*\b(?:original mix|release|official (?:audio|video|music video)|"
+    r"lyric video|lyrics|free download|explicit|clean|hq|hd)\b[^)\]]*[)\]]"
+)
+PUNCTUATION_PATTERN = re.compile(r"[^\w\s-]")
+# Words that mark a different version of a song, not just a differently named copy
+VERSION_WORDS = r"(?:remix|rmx|vip|edit|instrumental|extended|live|bootleg|acoustic|remaster(?:ed)?)"
+VERSION_BRACKET_PATTERN = re.compile(rf"[(\[]([^)\]]*\b{VERSION_WORDS}\b[^)\]]*)[)\]]")
+VERSION_DASH_PATTERN = re.compile(rf"\s-\s([^-]*\b{VERSION_WORDS}\b[^-]*)$")
+VERSION_TRAILING_PATTERN = re.compile(rf"(?<=\w)((?:\s+(?:{VERSION_WORDS}|\d+))+)$")
+SHINGLE_SIZE = 3        # character n-grams compared by MinHash
+LSH_BANDS = 8           # 8 bands of 4 rows: titles with ~60% shared n-grams meet in a bucket
+LSH_ROWS = 4
+MAX_BUCKET_SIZE = 200   # bigger buckets are skipped instead of compared pairwise
+
 def base_filename(filename):
     """Lowercased filename without (1), (2), extension"""
     name, _ = os.path.splitext(filename)
@@ -39,41 +78,750 @@ def title_variants(title):
     no_paren = PAREN_CONTENT_PATTERN.sub("", title).strip()
     return {title, no_paren}
 
-def get_album(filepath):
-    audio = File(filepath, easy=True)
+def read_tags(filepath):
+    """The tags needed here (album, title, artist, duration), or None if unreadable."""
+    try:
+        audio = File(filepath, easy=True)
+    except Exception as e:     # mutagen raises many different errors for broken files
+        print(f"Cannot read tags of {filepath}: {e}")
+        return None
     if not audio:
         return None
-    return audio.get("album", [None])[0].lower()
+    tags = audio.tags or {}
+
+    def first(name):
+        values = tags.get(name) or [None]
+        return values[0]
+
+    return {
+        "album": first("album"),
+        "title": first("title"),
+        "artist": first("artist"),
+        "duration": getattr(audio.info, "length", None),
+    }
+
+class TagCache:
+    """
+    Tags of files from earlier runs, stored as JSON.
+
+    Entries are keyed by path and only used while the file still has the
+    same size and modification time, so changed files are read again.
+    Files whose tags could not be read are stored too (as None), so they
+    are not tried again until they change.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Ignoring unreadable tag cache {path}: {e}")
+
+    def get(self, path, size, mtime_ns, default=None):
+        entry = self.entries.get(path)
+        if entry and entry["size"] == size and entry["mtime_ns"] == mtime_ns:
+            return entry["tags"]
+        return default
+
+    def put(self, path, size, mtime_ns, tags):
+        self.entries[path] = {"size": size, "mtime_ns": mtime_ns, "tags": tags}
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp, self.path)
+
+def read_tags_cached(songs, cache, workers=TAG_WORKERS):
+    """Set song["tags"] for all songs, reading only files missing from the cache."""
+    missing = []
+    unread = object()
+    for song in songs:
+        song["tags"] = cache.get(song["path"], song["size"], song["mtime_ns"], unread)
+        if song["tags"] is unread:
+            missing.append(song)
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for song, tags in zip(missing, executor.map(read_tags, (s["path"] for s in missing))):
+            song["tags"] = tags
+            cache.put(song["path"], song["size"], song["mtime_ns"], tags)
+    print(f"Tags: {len(songs) - len(missing)} from cache, {len(missing)} read "
+          f"({time.monotonic() - started:.1f}s)")
+
+# ---------- Fuzzy title matching ----------
+def _clean(text):
+    return " ".join(PUNCTUATION_PATTERN.sub(" ", text).split())
+
+def normalize_title(filename):
+    """
+    Canonical (base title, version tokens) of "Artist - Title" for fuzzy matching.
+
+    Folds unicode variants (NFKC, casefold, all kinds of dashes), writes
+    feat./ft./featuring the same way, drops bracketed noise such as
+    "(Original Mix)" or "[Monstercat Release]" and all other punctuation.
+    Version markers ("(VIP)", "(X Remix)", "- Radio Edit", a trailing
+    "2") are taken out of the title and returned as a sorted tuple, so
+    "Hero (VIP)" and "Hero" have the same base but different versions.
+    """
+    name = unicodedata.normalize("NFKC", base_filename(filename)).casefold()
+    name = DASH_PATTERN.sub("-", name).replace("_", " ")
+    name = NOISE_PATTERN.sub(" ", name)
+    name = FEAT_PATTERN.sub(" feat ", name)
+
+    artist, sep, title = name.partition(" - ")
+    if not sep:
+        artist, title = "", name
+    versions = VERSION_BRACKET_PATTERN.findall(title)
+    title = VERSION_BRACKET_PATTERN.sub(" ", title)
+    dashed = VERSION_DASH_PATTERN.search(title)
+    if dashed:
+        versions.append(dashed.group(1))
+        title = title[:dashed.start()]
+    title = _clean(title)
+    trailing = VERSION_TRAILING_PATTERN.search(title)
+    if trailing:
+        versions.extend(trailing.group(1).split())
+        title = title[:trailing.start()]
+
+    base = f"{_clean(artist)} - {title}" if sep else title
+    return base, tuple(sorted(_clean(v) for v in versions))
+
+def _minhash_masks(count, seed=0x5EED):
+    rng = zlib.crc32(seed.to_bytes(4, "little"))
+    masks = []
+    for i in range(count):
+        rng = zlib.crc32(i.to_bytes(4, "little"), rng)
+        masks.append(rng)
+    return masks
+
+MINHASH_MASKS = _minhash_masks(LSH_BANDS * LSH_ROWS)
+
+def minhash(text):
+    """MinHash signature of the character n-grams of text (one XOR mask per row)."""
+    padded = f" {text} "
+    shingles = {zlib.crc32(padded[i:i + SHINGLE_SIZE].encode())
+                for i in range(max(1, len(padded) - SHINGLE_SIZE + 1))}
+    return [min(h ^ mask for h in shingles) for mask in MINHASH_MASKS]
+
+def find_similar_titles(titles, threshold=FUZZY_THRESHOLD):
+    """
+    Groups of indices of titles that name the same song.
+
+    titles are (base, versions) pairs from normalize_title. Titles only match
+    if their version tokens are exactly equal, and then only the base titles
+    are compared. Each distinct title is scored against the representative
+    (first title) of every candidate group and joins the best one at or above
+    threshold, otherwise it starts a new group. Matches are not transitive, so
+    a chain of small differences cannot pull different songs into one group.
+
+    Candidates come from MinHash LSH: the signature of the base title is split
+    into LSH_BANDS bands and only representatives sharing a band (and so
+    probably many n-grams) are compared with SequenceMatcher, which avoids
+    comparing every pair of a 200k-file library.
+    """
+    started = time.monotonic()
+    by_title = {}
+    for i, title in enumerate(titles):
+        by_title.setdefault(title, []).append(i)
+    distinct = list(by_title)
+
+    buckets = {}
+    members = []            # distinct titles per group, the first one is the representative
+    skipped = set()
+    compared = matches = 0
+    matcher = SequenceMatcher(autojunk=False)
+    for t, (base, versions) in enumerate(distinct):
+        signature = minhash(base)
+        keys = [(band, versions, *signature[band * LSH_ROWS:(band + 1) * LSH_ROWS])
+                for band in range(LSH_BANDS)]
+        candidates = set()
+        for key in keys:
+            bucket = buckets.get(key, ())
+            if len(bucket) > MAX_BUCKET_SIZE:
+                skipped.add(key)
+            else:
+                candidates.update(bucket)
+
+        # SequenceMatcher caches its analysis of seq2, so keep the new title there
+        matcher.set_seq2(base)
+        best, best_score = None, threshold
+        for g in sorted(candidates):
+            compared += 1
+            matcher.set_seq1(distinct[members[g][0]][0])
+            # Cheap upper bounds first, the exact ratio only for likely matches
+            if matcher.real_quick_ratio() < best_score or matcher.quick_ratio() < best_score:
+                continue
+            score = matcher.ratio()
+            if score > best_score or (best is None and score >= best_score):
+                best, best_score = g, score
+
+        if best is None:
+            best = len(members)
+            members.append([])
+            for key in keys:
+                bucket = buckets.setdefault(key, [])
+                if len(bucket) <= MAX_BUCKET_SIZE:
+                    bucket.append(best)
+        else:
+            matches += 1
+        members[best].append(t)
 
-songs = {}
-failures = []
+    groups = [[i for t in group for i in by_title[distinct[t]]] for group in members]
+    groups = [g for g in groups if len(g) > 1]
 
-# ---------- STEP 1: Scan files ----------
-for root, _, files in os.walk(MUSIC_DIR):
-    for file in files:
-        if not file.lower().endswith((".mp3", ".flac", ".wav", ".m4a")):
+    print(f"Fuzzy titles: {len(distinct)} distinct, {compared} pairs compared, "
+          f"{matches} similar, {sum(len(g) for g in groups)} files in {len(groups)} groups "
+          f"({time.monotonic() - started:.1f}s)")
+    if skipped:
+        print(f"  skipped {len(skipped)} oversized buckets (> {MAX_BUCKET_SIZE} titles)")
+    return groups
+
+# ---------- Audio payload hashing ----------
+def _id3v2_size(f):
+    """Size of an ID3v2 tag at the current position (0 if there is none)."""
+    header = f.read(10)
+    if len(header) < 10 or header[:3] != b"ID3":
+        return 0
+    size = (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+    footer = 10 if header[5] & 0x10 else 0
+    return 10 + size + footer
+
+def _trailing_tags_size(f, end):
+    """Size of ID3v1 and APEv2 tags at the end of an MP3 file."""
+    trailing = 0
+    if end >= 128:
+        f.seek(end - 128)
+        if f.read(3) == b"TAG":
+            trailing += 128
+    if end - trailing >= 32:
+        f.seek(end - trailing - 32)
+        footer = f.read(32)
+        if footer[:8] == b"APETAGEX":
+            size, _, flags = struct.unpack("<III", footer[12:24])
+            header = 32 if flags & 0x80000000 else 0
+            trailing += size + header
+    return trailing
+
+def _flac_audio_range(f, start, end):
+    """Skip the fLaC marker and all metadata blocks (tags, pictures, padding)."""
+    f.seek(start)
+    if f.read(4) != b"fLaC":
+        return None
+    pos = start + 4
+    while pos < end:
+        f.seek(pos)
+        header = f.read(4)
+        if len(header) < 4:
+            return None
+        pos += 4 + int.from_bytes(header[1:4], "big")
+        if header[0] & 0x80:        # last metadata block
+            break
+    return [(pos, end - pos)]
+
+def _chunk_ranges(f, start, end, wanted, header_size, read_header):
+    """Ranges of all top-level chunks/atoms whose type is in wanted."""
+    ranges = []
+    pos = start
+    while pos + header_size <= end:
+        f.seek(pos)
+        parsed = read_header(f, pos, end)
+        if parsed is None:
+            return None
+        kind, data_start, data_end = parsed
+        if data_end > end or data_end <= pos:
+            return None
+        if kind in wanted:
+            ranges.append((data_start, data_end - data_start))
+        pos = data_end
+    return ranges
+
+def _mp4_atom(f, pos, end):
+    header = f.read(8)
+    size, kind = struct.unpack(">I4s", header)
+    data_start = pos + 8
+    if size == 1:                   # 64-bit extended size
+        size = struct.unpack(">Q", f.read(8))[0]
+        data_start += 8
+    elif size == 0:                 # atom extends to the end of the file
+        size = end - pos
+    return kind, data_start, pos + size
+
+def _riff_chunk(f, pos, end):
+    kind, size = struct.unpack("<4sI", f.read(8))
+    return kind, pos + 8, pos + 8 + size + (size & 1)
+
+def audio_payload_ranges(path):
+    """
+    Return the (offset, length) ranges of a file that hold audio data.
+
+    Tag blocks are left out, so re-tagging a file does not change its hash:
+    ID3v2/ID3v1/APEv2 tags of MP3 files, FLAC metadata blocks, all MP4
+    atoms except "mdat" (tags live in "moov") and all WAV chunks except
+    "data". Unknown layouts fall back to the whole file.
+    """
+    end = os.path.getsize(path)
+    with open(path, "rb") as f:
+        start = _id3v2_size(f)
+        f.seek(start)
+        magic = f.read(12)
+
+        ranges = None
+        if magic[:4] == b"fLaC":
+            ranges = _flac_audio_range(f, start, end)
+        elif magic[4:8] == b"ftyp":
+            ranges = _chunk_ranges(f, start, end, {b"mdat"}, 8, _mp4_atom)
+        elif magic[:4] == b"RIFF" and magic[8:12] == b"WAVE":
+            ranges = _chunk_ranges(f, start + 12, end, {b"data"}, 8, _riff_chunk)
+        else:
+            ranges = [(start, end - start - _trailing_tags_size(f, end))]
+
+    if not ranges:
+        return [(0, end)]
+    return ranges
+
+def audio_hash(path):
+    """Hash of the audio data of a file (see audio_payload_ranges), or None on errors."""
+    try:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            for offset, length in audio_payload_ranges(path):
+                f.seek(offset)
+                while length > 0:
+                    chunk = f.read(min(HASH_CHUNK_SIZE, length))
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    length -= len(chunk)
+        return digest.hexdigest()
+    except (OSError, struct.error) as e:
+        print(f"Cannot hash {path}: {e}")
+        return None
+
+def hash_files(paths, workers=HASH_WORKERS):
+    """Audio hashes of all paths, computed in parallel worker processes."""
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(audio_hash, paths, chunksize=16))
+
+def audio_length(path):
+    """Number of audio data bytes of a file (see audio_payload_ranges), or None on errors."""
+    try:
+        return sum(length for _, length in audio_payload_ranges(path))
+    except (OSError, struct.error) as e:
+        print(f"Cannot read {path}: {e}")
+        return None
+
+def _read_payload(f, ranges, skip, count):
+    """count bytes of the audio data, starting skip bytes into it."""
+    data = bytearray()
+    for offset, length in ranges:
+        if skip >= length:
+            skip -= length
             continue
+        f.seek(offset + skip)
+        data += f.read(min(count - len(data), length - skip))
+        skip = 0
+        if len(data) >= count:
+            break
+    return bytes(data)
 
-        path = os.path.join(root, file)
-        album = get_album(path)
-        if not album:
-            print(f"Missing metadata for {file}")
+def partial_audio_hash(path):
+    """Hash of the first and last PARTIAL_HASH_SIZE bytes of the audio data, or None on errors."""
+    try:
+        ranges = audio_payload_ranges(path)
+        total = sum(length for _, length in ranges)
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            digest.update(_read_payload(f, ranges, 0, PARTIAL_HASH_SIZE))
+            if total > PARTIAL_HASH_SIZE:
+                tail = max(PARTIAL_HASH_SIZE, total - PARTIAL_HASH_SIZE)
+                digest.update(_read_payload(f, ranges, tail, total - tail))
+        return digest.hexdigest()
+    except (OSError, struct.error) as e:
+        print(f"Cannot hash {path}: {e}")
+        return None
+
+def _report_stage(stage, groups, started):
+    n = sum(len(g) for g in groups)
+    print(f"  {stage:<13} {n:>7} files in {len(groups):>6} groups ({time.monotonic() - started:.1f}s)")
+
+def find_identical_audio(paths, workers=HASH_WORKERS):
+    """
+    Groups of indices of files with identical audio data, whatever their tags.
+
+    Works like find_identical_files, but on the audio data only: group by
+    its length, then by a partial hash of it, and fully hash (in worker
+    processes) only the files that still share a group.
+    """
+    print(f"Identical audio among {len(paths)} files:")
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=IO_WORKERS) as executor:
+        lengths = list(executor.map(audio_length, paths))
+    groups = groups_by(lengths)
+    _report_stage("audio length", groups, started)
+
+    started = time.monotonic()
+    groups = _refine(groups, paths, partial_audio_hash, IO_WORKERS)
+    _report_stage("partial hash", groups, started)
+
+    started = time.monotonic()
+    small = [g for g in groups if lengths[g[0]] <= 2 * PARTIAL_HASH_SIZE]
+    large = [g for g in groups if lengths[g[0]] > 2 * PARTIAL_HASH_SIZE]
+    candidates = [i for g in large for i in g]
+    hashes = dict(zip(candidates, hash_files([paths[i] for i in candidates], workers)))
+    for group in large:
+        by_hash = {}
+        for i in group:
+            if hashes[i] is not None:
+                by_hash.setdefault(hashes[i], []).append(i)
+        small.extend(g for g in by_hash.values() if len(g) > 1)
+    groups = small
+    _report_stage("full hash", groups, started)
+    return groups
+
+# ---------- Byte-identical files ----------
+def partial_hash(path):
+    """Hash of the first and last PARTIAL_HASH_SIZE bytes of a file, or None on errors."""
+    try:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            digest.update(f.read(PARTIAL_HASH_SIZE))
+            size = f.seek(0, os.SEEK_END)
+            if size > PARTIAL_HASH_SIZE:
+                f.seek(max(PARTIAL_HASH_SIZE, size - PARTIAL_HASH_SIZE))
+                digest.update(f.read(PARTIAL_HASH_SIZE))
+        return digest.hexdigest()
+    except OSError as e:
+        print(f"Cannot hash {path}: {e}")
+        return None
+
+def full_hash(path):
+    """Hash of the whole file, or None on errors."""
+    try:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            while chunk := f.read(HASH_CHUNK_SIZE):
+                digest.update(chunk)
+        return digest.hexdigest()
+    except OSError as e:
+        print(f"Cannot hash {path}: {e}")
+        return None
+
+def _refine(groups, paths, hash_func, workers):
+    """Split every group by hash_func of its files; keep groups with 2+ files."""
+    candidates = [i for group in groups for i in group]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        hashes = dict(zip(candidates, executor.map(hash_func, (paths[i] for i in candidates))))
+    refined = []
+    for group in groups:
+        by_hash = {}
+        for i in group:
+            if hashes[i] is not None:
+                by_hash.setdefault(hashes[i], []).append(i)
+        refined.extend(g for g in by_hash.values() if len(g) > 1)
+    return refined
+
+def find_identical_files(paths, sizes, workers=IO_WORKERS):
+    """
+    Groups of indices of byte-identical files, found like fdupes does.
+
+    1. Group by size. A file with a unique size cannot have a copy.
+    2. Hash the first and last PARTIAL_HASH_SIZE bytes of the remaining files.
+    3. Fully hash only the files that still share a group. Files that fit
+       into the partial hash are already fully compared.
+    Every stage only reads the files that survived the previous one.
+    """
+    print(f"Byte-identical files among {len(paths)} files:")
+    started = time.monotonic()
+    groups = groups_by(sizes)
+    _report_stage("size", groups, started)
+
+    started = time.monotonic()
+    groups = _refine(groups, paths, partial_hash, workers)
+    _report_stage("partial hash", groups, started)
+
+    started = time.monotonic()
+    small = [g for g in groups if sizes[g[0]] <= 2 * PARTIAL_HASH_SIZE]
+    large = [g for g in groups if sizes[g[0]] > 2 * PARTIAL_HASH_SIZE]
+    groups = small + _refine(large, paths, full_hash, workers)
+    _report_stage("full hash", groups, started)
+    return groups
+
+# ---------- Grouping ----------
+def merge_groups(songs, groupings):
+    """
+    Merge all groupings of songs into clusters.
+
+    Each grouping is a list of lists of indices into songs. Two songs end up
+    in the same cluster if any grouping puts them together (union-find).
+    """
+    parent = list(range(len(songs)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for groups in groupings:
+        for group in groups:
+            root = find(group[0])
+            for i in group[1:]:
+                parent[find(i)] = root
+
+    clusters = {}
+    for i, song in enumerate(songs):
+        clusters.setdefault(find(i), []).append(song)
+    return list(clusters.values())
+
+def groups_by(values):
+    """Lists of indices with equal, non-None values."""
+    groups = {}
+    for i, value in enumerate(values):
+        if value is not None:
+            groups.setdefault(value, []).append(i)
+    return [g for g in groups.values() if len(g) > 1]
+
+# ---------- Moving ----------
+def unique_destination(dest, taken):
+    """dest, or "name (2).ext", "name (3).ext", ... if it exists or is already taken."""
+    base, ext = os.path.splitext(dest)
+    candidate = dest
+    n = 1
+    while candidate in taken or os.path.lexists(candidate):
+        n += 1
+        candidate = f"{base} ({n}){ext}"
+    taken.add(candidate)
+    return candidate
+
+def plan_moves(moves, removed_dir):
+    """
+    Plan entries for (song, kept song) pairs.
+
+    All duplicates go flat into removed_dir, so files with the same name
+    from different folders get a numbered name instead of overwriting
+    each other. Paths are absolute, so a plan (and the undo journal made
+    from it) works from any working directory.
+    """
+    removed_dir = os.path.abspath(removed_dir)
+    taken = set()
+    plan = []
+    for song, keep in moves:
+        src = os.path.abspath(song["path"])
+        dest = unique_destination(os.path.join(removed_dir, os.path.basename(src)), taken)
+        plan.append({"src": src, "dst": dest, "reason": f"duplicate of {os.path.abspath(keep['path'])}"})
+    return plan
+
+def move_file(src, dst, devices):
+    """Rename when src and the destination folder are on the same device, copy otherwise."""
+    folder = os.path.dirname(dst) or "."
+    if folder not in devices:
+        os.makedirs(folder, exist_ok=True)
+        devices[folder] = os.stat(folder).st_dev
+    if os.stat(src).st_dev == devices[folder]:
+        os.rename(src, dst)
+    else:
+        shutil.move(src, dst)
+
+def apply_plan(plan, journal_path, dry_run=False):
+    """
+    Carry out the moves of a plan and record them in an undo journal.
+
+    Moves are done in batches of MOVE_BATCH. The journal lines of a batch
+    are written and synced before its files are moved, so after a crash
+    the journal may list a move that did not happen (undo skips it) but
+    never misses one that did. Moves whose source is gone are skipped,
+    which makes applying the same plan again cheap.
+    """
+    started = time.monotonic()
+    counts = {"moved": 0, "skipped": 0, "failed": 0}
+    taken = set()
+    devices = {}
+
+    journal = None
+    if not dry_run:
+        os.makedirs(os.path.dirname(journal_path) or ".", exist_ok=True)
+        journal = open(journal_path, "a", encoding="utf-8")
+    try:
+        for start in range(0, len(plan), MOVE_BATCH):
+            batch = []
+            for move in plan[start:start + MOVE_BATCH]:
+                if not os.path.lexists(move["src"]):
+                    counts["skipped"] += 1
+                    continue
+                # The plan may be older than the folder contents: never overwrite
+                batch.append(dict(move, dst=unique_destination(move["dst"], taken)))
+
+            if dry_run:
+                for move in batch:
+                    print(f"[DRY-RUN] Would move: {move['src']} → {move['dst']}")
+                counts["moved"] += len(batch)
+                continue
+
+            journal.writelines(json.dumps(move) + "\n" for move in batch)
+            journal.flush()
+            os.fsync(journal.fileno())
+
+            for move in batch:
+                try:
+                    move_file(move["src"], move["dst"], devices)
+                    counts["moved"] += 1
+                except OSError as e:
+                    print(f"Cannot move {move['src']}: {e}")
+                    counts["failed"] += 1
+    finally:
+        if journal:
+            journal.close()
+
+    print(f"{'Would move' if dry_run else 'Moved'} {counts['moved']} files, "
+          f"skipped {counts['skipped']} already gone, {counts['failed']} failed "
+          f"({time.monotonic() - started:.1f}s)")
+    if journal:
+        print(f"Undo journal: {journal_path}")
+    return counts
+
+def read_journal(path):
+    """Moves recorded in an undo journal; a line cut off by a crash is ignored."""
+    moves = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                moves.append(json.loads(line))
+            except json.JSONDecodeError:
+                print(f"Ignoring damaged journal line: {line.strip()}")
+    return moves
+
+def undo_journal(journal_path, dry_run=False):
+    """Move the files of a journal back, newest first. Undoing twice does nothing."""
+    started = time.monotonic()
+    counts = {"restored": 0, "skipped": 0, "failed": 0}
+    devices = {}
+    for move in reversed(read_journal(journal_path)):
+        if not os.path.lexists(move["dst"]) or os.path.lexists(move["src"]):
+            counts["skipped"] += 1
+            continue
+        if dry_run:
+            print(f"[DRY-RUN] Would restore: {move['dst']} → {move['src']}")
+            counts["restored"] += 1
             continue
+        try:
+            move_file(move["dst"], move["src"], devices)
+            counts["restored"] += 1
+        except OSError as e:
+            print(f"Cannot restore {move['src']}: {e}")
+            counts["failed"] += 1
+    print(f"{'Would restore' if dry_run else 'Restored'} {counts['restored']} files, "
+          f"skipped {counts['skipped']}, {counts['failed']} failed "
+          f"({time.monotonic() - started:.1f}s)")
+    return counts
+
+def write_plan(plan, path):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(plan, f, indent=1, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def read_plan(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def parse_args(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # Without a command the script behaves like before: scan and move
+    if argv and argv[0] not in COMMANDS and argv[0] not in ("-h", "--help"):
+        argv = ["run"] + argv
+
+    scan = argparse.ArgumentParser(add_help=False)
+    scan.add_argument("music_dir", help="Music library to scan (recursively).")
+    scan.add_argument("removed_dir", help="Folder the duplicates are moved into.")
+    scan.add_argument("--no-content-match", dest="content_match", action="store_false",
+                      default=CONTENT_MATCH,
+                      help="Do not hash the audio data to find renamed or re-tagged copies.")
+    scan.add_argument("--no-exact-match", dest="exact_match", action="store_false",
+                      default=EXACT_MATCH,
+                      help="Do not look for byte-identical files.")
+    scan.add_argument("--fuzzy", action="store_true",
+                      help="Also group songs whose normalized titles are similar "
+                           "(feat./ft., dashes, \"(Original Mix)\", \"[... Release]\", ...).")
+    scan.add_argument("--fuzzy-threshold", type=float, default=FUZZY_THRESHOLD,
+                      help=f"Similarity from 0 to 1 needed for --fuzzy (default: {FUZZY_THRESHOLD}).")
+    scan.add_argument("--jobs", "-j", type=int, default=HASH_WORKERS,
+                      help="Worker processes for audio hashing (default: number of CPUs).")
+    scan.add_argument("--tag-workers", type=int, default=TAG_WORKERS,
+                      help=f"Threads reading tags (default: {TAG_WORKERS}).")
+    scan.add_argument("--cache", default=TAG_CACHE,
+                      help=f"Tag cache file (default: {TAG_CACHE}).")
+    scan.add_argument("--no-cache", dest="cache", action="store_const", const=None,
+                      help="Neither use nor update the tag cache.")
+
+    parser = argparse.ArgumentParser(
+        description="Move duplicate songs (same name, same audio or byte-identical copies) "
+                    "out of a music library, keeping the album version over singles and remixes."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", parents=[scan],
+                              help="Scan and move the duplicates (default when no command is given).")
+    run.add_argument("--dry-run", "-n", action="store_true",
+                     help="Only print what would be moved.")
+    run.add_argument("--journal",
+                     help=f"Undo journal (default: {UNDO_JOURNAL} in the removed folder).")
 
-        key = base_filename(file)
+    plan = commands.add_parser("plan", parents=[scan],
+                               help="Scan and write the moves to a JSON plan without moving anything.")
+    plan.add_argument("--output", "-o", default=PLAN_FILE,
+                      help=f"Plan file (default: {PLAN_FILE}).")
 
-        songs.setdefault(key, []).append({
-            "path": path,
-            "file": file,
-            "album": album,
-            "title_variants": title_variants(extract_title(file))
-        })
+    apply = commands.add_parser("apply", help="Carry out the moves of a plan.")
+    apply.add_argument("plan", help="Plan file written by the plan command.")
+    apply.add_argument("--dry-run", "-n", action="store_true",
+                       help="Only print what would be moved.")
+    apply.add_argument("--journal",
+                       help="Undo journal (default: the plan file with .undo.jsonl).")
 
-# ---------- STEP 2: Resolve duplicates ----------
-for key, versions in songs.items():
+    undo = commands.add_parser("undo", help="Move the files of an undo journal back.")
+    undo.add_argument("journal", help="Undo journal written by run or apply.")
+    undo.add_argument("--dry-run", "-n", action="store_true",
+                      help="Only print what would be restored.")
+
+    return parser.parse_args(argv)
+
+def resolve_cluster(versions):
+    """
+    The (song, kept song) moves for one cluster of duplicates, and a failure
+    entry (or None) if single and album versions cannot be told apart.
+
+    A version is a single if its album is named like its title. If all
+    files share one name, the title comes from the file name as always.
+    Clusters found by audio content, bytes or fuzzy titles hold differently
+    named files ("Artist - Hero.flac", "hero_final.flac"), so the title tag
+    is used there, and the file name only for files without one.
+    """
+    tagged = []
+    for v in versions:
+        album = (v["tags"] or {}).get("album")
+        if not album:
+            print(f"Missing metadata for {v['file']}")
+            continue
+        v["album"] = album.lower()
+        tagged.append(v)
+    versions = tagged
     if len(versions) < 2:
-        continue
+        return [], None
 
+    same_name = len({v["key"] for v in versions}) == 1
+    for v in versions:
+        title = v["tags"].get("title")
+        if not same_name and title:
+            v["title_variants"] = title_variants(title.lower().strip())
+
+    key = versions[0]["key"]
     singles = []
     albums = []
 
@@ -85,11 +833,7 @@ for key, versions in songs.items():
 
     # Edge case: ambiguous single vs album
     if singles and albums and any(a["album"] in s["title_variants"] for s in singles for a in albums):
-        failures.append({
-            "song": key,
-            "files": [v["path"] for v in versions]
-        })
-        continue
+        return [], {"song": key, "files": [v["path"] for v in versions]}
 
     normal_albums = [
         a for a in albums
@@ -101,26 +845,92 @@ for key, versions in songs.items():
     elif singles:
         keep = singles[0]
     else:
-        continue
+        return [], None
 
-    for v in versions:
-        if v is keep:
-            continue
+    return [(v, keep) for v in versions if v is not keep], None
+
+def find_duplicates(args):
+    """Scan the library and return the (song, kept song) pairs to move."""
+    songs = []
+    failures = []
+    moves = []
+
+    # ---------- STEP 1: Scan files ----------
+    for root, _, files in os.walk(args.music_dir):
+        for file in files:
+            if not file.lower().endswith(AUDIO_EXTENSIONS):
+                continue
+
+            path = os.path.join(root, file)
+            try:
+                st = os.stat(path)
+            except OSError as e:
+                print(f"Cannot read {path}: {e}")
+                continue
+            songs.append({
+                "path": path,
+                "file": file,
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "key": base_filename(file),
+                "title_variants": title_variants(extract_title(file))
+            })
+
+    # ---------- STEP 2: Group duplicates ----------
+    groupings = [groups_by([s["key"] for s in songs])]
+    if args.fuzzy:
+        groupings.append(find_similar_titles([normalize_title(s["file"]) for s in songs],
+                                             args.fuzzy_threshold))
+    if args.exact_match:
+        groupings.append(find_identical_files([s["path"] for s in songs], [s["size"] for s in songs]))
+    if args.content_match:
+        groupings.append(find_identical_audio([s["path"] for s in songs], max(1, args.jobs)))
 
-        dest = os.path.join(REMOVED_DIR, os.path.basename(v["path"]))
+    clusters = [c for c in merge_groups(songs, groupings) if len(c) > 1]
+    print(f"{sum(len(c) for c in clusters)} of {len(songs)} files are in {len(clusters)} duplicate groups")
 
-        if DRY_RUN:
-            print(f"[DRY-RUN] Would move: {v['path']} → {dest}")
+    # ---------- STEP 3: Read tags ----------
+    # Only files that have duplicates get their tags read
+    cache = TagCache(args.cache)
+    read_tags_cached([v for versions in clusters for v in versions], cache, max(1, args.tag_workers))
+    cache.save()
+
+    # ---------- STEP 4: Resolve duplicates ----------
+    for versions in clusters:
+        cluster_moves, failure = resolve_cluster(versions)
+        moves.extend(cluster_moves)
+        if failure:
+            failures.append(failure)
+
+    # ---------- STEP 5: Print failures ----------
+    if failures:
+        print("\n=== FAILURE LIST ===")
+        for f in failures:
+            print(f"\nSong key: {f['song']}")
+            for file in f["files"]:
+                print(f"  - {file}")
+        print()
+
+    return moves
+
+def main():
+    args = parse_args()
+
+    if args.command == "undo":
+        undo_journal(args.journal, args.dry_run)
+    elif args.command == "apply":
+        journal = args.journal or os.path.splitext(args.plan)[0] + ".undo.jsonl"
+        apply_plan(read_plan(args.plan), journal, args.dry_run)
+    else:
+        plan = plan_moves(find_duplicates(args), args.removed_dir)
+        if args.command == "plan":
+            write_plan(plan, args.output)
+            print(f"Planned {len(plan)} moves, written to {args.output}")
         else:
-            print(f"Moving: {v['path']} → {dest}")
-            shutil.move(v["path"], dest)
-
-# ---------- STEP 3: Print failures ----------
-if failures:
-    print("\n=== FAILURE LIST ===")
-    for f in failures:
-        print(f"\nSong key: {f['song']}")
-        for file in f["files"]:
-            print(f"  - {file}")
-
-print("\nDone.")
+            journal = args.journal or os.path.join(args.removed_dir, UNDO_JOURNAL)
+            apply_plan(plan, journal, args.dry_run)
+
+    print("\nDone.")
+
+if __name__ == "__main__":
+    main()
@@ -29,9 +29,11 @@ Aufruf-Beispiele:
     python timer.py --minutes 10        # 10 Minuten -> 10 Segmente
     python timer.py --seconds 90        # nicht durch 60 teilbar -> DEFAULT_SEGMENTS_FALLBACK Segmente
     python timer.py --minutes 10 --segments 6 --fullscreen
+    python timer.py --stats             # Zeichenzeit/Jitter beim Beenden ausgeben
 """
 
 import argparse
+import sys
 import time
 import tkinter as tk
 
@@ -57,6 +59,7 @@ MARGIN = 60                    # Außenabstand
 FRAME_PADDING = 14             # Abstand zwischen Segmenten und Außenrahmen
 
 MIN_SEGMENTS = 1               # es muss mindestens ein Segment übrig bleiben
+MIN_FRAME_INTERVAL = 0.033     # nie öfter als ~30 Bilder pro Sekunde, auch bei sehr kurzen Segmenten
 
 
 def lerp(a, b, t):
@@ -64,21 +67,51 @@ def lerp(a, b, t):
     return a + (b - a) * t
 
 
+def hex_to_rgb(color):
+    return int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16)
+
+
 def lerp_color(c1, c2, t):
     """Interpoliert zwischen zwei Hexfarben."""
     t = max(0.0, min(1.0, t))
-    r1, g1, b1 = int(c1[1:3], 16), int(c1[3:5], 16), int(c1[5:7], 16)
-    r2, g2, b2 = int(c2[1:3], 16), int(c2[3:5], 16), int(c2[5:7], 16)
+    r1, g1, b1 = hex_to_rgb(c1)
+    r2, g2, b2 = hex_to_rgb(c2)
     r = int(lerp(r1, r2, t))
     g = int(lerp(g1, g2, t))
     b = int(lerp(b1, b2, t))
     return f"#{r:02x}{g:02x}{b:02x}"
 
 
-class TimerApp:
-    def __init__(self, root, total_seconds: float, segments: int, start_fullscreen: bool):
-        self.root = root
-        self.is_fullscreen = start_fullscreen
+# Farbverlauf von SEGMENT_OFF nach SEGMENT_ON, einmal vorberechnet statt
+# in jedem Frame Hexstrings zu zerlegen. So viele Stufen, wie sich der
+# stärkste Farbkanal ändert - feiner kann man den Verlauf gar nicht sehen.
+GRADIENT_STEPS = max(abs(a - b) for a, b in zip(hex_to_rgb(SEGMENT_OFF), hex_to_rgb(SEGMENT_ON)))
+GRADIENT = [lerp_color(SEGMENT_OFF, SEGMENT_ON, i / GRADIENT_STEPS) for i in range(GRADIENT_STEPS + 1)]
+
+
+def segment_color(fill_amount):
+    """Farbe eines Segments, das zu fill_amount (0..1) leuchtet."""
+    if fill_amount <= 0:
+        return SEGMENT_OFF
+    if fill_amount >= 1:
+        return SEGMENT_ON
+    return GRADIENT[int(fill_amount * GRADIENT_STEPS)]
+
+
+STATS_BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 50, 100, 250]  # Obergrenzen der Histogramm-Klassen
+
+
+class TimerModel:
+    """
+    Der eigentliche Timer, ohne Tk.
+
+    Die Uhr ist austauschbar (clock, Standard time.monotonic), damit sich
+    der Timer ohne Bildschirm und ohne echtes Warten testen und messen
+    lässt - z.B. mit einer Uhr, die man von Hand vorstellt.
+    """
+
+    def __init__(self, total_seconds: float, segments: int, clock=time.monotonic):
+        self.clock = clock
 
         # Die Dauer EINES Segments bleibt für die gesamte Laufzeit fix.
         # Verlängern/Verkürzen ändert nur die Anzahl der Segmente, nie
@@ -92,6 +125,142 @@ class TimerApp:
         self.elapsed = 0.0          # bereits verstrichene Zeit (für Pause)
         self.last_tick = None       # Zeitpunkt des letzten Frames
 
+    @property
+    def total_seconds(self):
+        return self.segment_duration * self.segment_count
+
+    @property
+    def lit_units(self):
+        """Leuchtende Segmente, z.B. 3.4 -> 3 volle Segmente + Segment 4 zu 40%."""
+        progress = 0.0 if self.total_seconds <= 0 else self.elapsed / self.total_seconds
+        return max(0.0, min(1.0, progress)) * self.segment_count
+
+    @property
+    def ticking(self):
+        return self.running and not self.finished
+
+    def toggle_running(self):
+        if self.finished:
+            return
+        if self.running:
+            # Zeit bis zum Pausieren noch mitnehmen
+            self.advance()
+            self.running = False
+        else:
+            self.running = True
+            self.last_tick = self.clock()
+
+    def reset(self):
+        self.running = False
+        self.finished = False
+        self.elapsed = 0.0
+        self.last_tick = None
+
+    def add_segment(self):
+        """Verlängert die Zeit um ein weiteres Segment gleicher Länge."""
+        self.segment_count += 1
+        # Falls die Zeit vorher abgelaufen war, ist jetzt wieder Zeit übrig
+        if self.elapsed < self.total_seconds:
+            self.finished = False
+
+    def remove_segment(self):
+        """Verkürzt die Zeit um ein Segment (das letzte wird entfernt)."""
+        if self.segment_count <= MIN_SEGMENTS:
+            return False
+        self.segment_count -= 1
+        if self.elapsed > self.total_seconds:
+            self.elapsed = self.total_seconds
+        if self.elapsed >= self.total_seconds:
+            self.finished = True
+            self.running = False
+        return True
+
+    def advance(self):
+        """Verstrichene Zeit seit dem letzten Aufruf dazurechnen."""
+        if not self.ticking:
+            return
+        now = self.clock()
+        dt = now - self.last_tick
+        self.last_tick = now
+        self.elapsed = min(self.total_seconds, self.elapsed + dt)
+        if self.elapsed >= self.total_seconds:
+            self.finished = True
+            self.running = False
+
+    def seconds_until_next_step(self):
+        """Zeit, bis sich die Farbe des aktiven Segments das nächste Mal ändert."""
+        units = self.elapsed / self.segment_duration
+        segment = int(units)
+        step = int((units - segment) * GRADIENT_STEPS)
+        next_elapsed = (segment + (step + 1) / GRADIENT_STEPS) * self.segment_duration
+        return max(0.0, min(self.total_seconds, next_elapsed) - self.elapsed)
+
+    def next_frame_delay(self):
+        """Wartezeit bis zum nächsten Frame in ganzen Millisekunden."""
+        # +1 ms, damit der Frame sicher hinter der Stufe liegt und nicht
+        # wegen Rundung noch die alte Farbe zeigt
+        delay_ms = int(self.seconds_until_next_step() * 1000) + 1
+        return max(delay_ms, int(MIN_FRAME_INTERVAL * 1000))
+
+
+class FrameStats:
+    """
+    Sammelt Zeichenzeit pro Frame und die Verspätung der Frames (Jitter)
+    gegenüber dem geplanten Zeitpunkt als Histogramme in Millisekunden.
+    """
+
+    def __init__(self):
+        self.draw_ms = []
+        self.jitter_ms = []
+
+    def add_draw(self, seconds):
+        self.draw_ms.append(seconds * 1000)
+
+    def add_jitter(self, seconds):
+        self.jitter_ms.append(seconds * 1000)
+
+    @staticmethod
+    def histogram(values):
+        counts = [0] * (len(STATS_BUCKETS_MS) + 1)
+        for v in values:
+            for i, limit in enumerate(STATS_BUCKETS_MS):
+                if v <= limit:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+        return counts
+
+    def report(self):
+        lines = []
+        for name, values in (("Zeichnen", self.draw_ms), ("Jitter", self.jitter_ms)):
+            if not values:
+                lines.append(f"{name}: keine Frames")
+                continue
+            ordered = sorted(values)
+            p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+            lines.append(f"{name}: {len(values)} Frames, Mittel {sum(values) / len(values):.3f} ms, "
+                         f"p99 {p99:.3f} ms, max {ordered[-1]:.3f} ms")
+            lower = 0
+            for limit, count in zip(STATS_BUCKETS_MS + [None], self.histogram(values)):
+                label = f"{lower:>6g} - {limit:<6g} ms" if limit else f"   > {lower:<8g} ms"
+                bar = "#" * round(40 * count / len(values))
+                lines.append(f"  {label} {count:>8}  {bar}")
+                lower = limit
+        return "\n".join(lines)
+
+
+class TimerApp:
+    def __init__(self, root, total_seconds: float, segments: int, start_fullscreen: bool,
+                 clock=time.monotonic, stats: FrameStats = None):
+        self.root = root
+        self.is_fullscreen = start_fullscreen
+        self.timer = TimerModel(total_seconds, segments, clock)
+        self.stats = stats          # optional: Zeichenzeit/Jitter messen (--stats)
+
+        self.after_id = None        # geplanter nächster Frame (root.after)
+        self.deadline = None        # geplanter Zeitpunkt dieses Frames (für den Jitter)
+
         self.root.title("Timer")
         self.root.configure(bg=BG_COLOR)
         self.root.geometry("1000x300")
@@ -99,19 +268,23 @@ class TimerApp:
         self.canvas = tk.Canvas(root, bg=BG_COLOR, highlightthickness=0)
         self.canvas.pack(fill="both", expand=True)
 
+        # Canvas-Elemente werden nur bei Größen- oder Segmentänderung neu
+        # angelegt, sonst nur umgefärbt (siehe draw/_build).
+        self.layout = None          # (Breite, Höhe, Segmente) der angelegten Elemente
+        self.segment_items = []
+        self.segment_colors = []
+        self.hint_item = None
+        self.hint_visible = True
+        self.bg = None
+
         self._bind_keys()
-        self.canvas.bind("<Configure>", lambda e: self.draw())
+        self.canvas.bind("<Configure>", lambda e: self.refresh())
         self.canvas.bind("<Button-1>", lambda e: self.toggle_running())
 
         if self.is_fullscreen:
             self.root.attributes("-fullscreen", True)
 
-        self.draw()
-        self._loop()
-
-    @property
-    def total_seconds(self):
-        return self.segment_duration * self.segment_count
+        self.refresh()
 
     # ------------------------------------------------------------------
     # Eingaben
@@ -146,79 +319,102 @@ class TimerApp:
     def set_fullscreen(self, value: bool):
         self.is_fullscreen = value
         self.root.attributes("-fullscreen", value)
-        self.draw()
+        self.refresh()
 
     def toggle_running(self):
-        if self.finished:
-            return
-        if self.running:
-            self.running = False
-        else:
-            self.running = True
-            self.last_tick = time.monotonic()
+        self.timer.toggle_running()
+        self.refresh()
 
     def reset(self):
-        self.running = False
-        self.finished = False
-        self.elapsed = 0.0
-        self.last_tick = None
-        self.draw()
+        self.timer.reset()
+        self.refresh()
 
     def add_segment(self):
-        """Verlängert die Zeit um ein weiteres Segment gleicher Länge."""
-        self.segment_count += 1
-        # Falls die Zeit vorher abgelaufen war, ist jetzt wieder Zeit übrig
-        if self.elapsed < self.total_seconds:
-            self.finished = False
-        self.draw()
+        self.timer.add_segment()
+        self.refresh()
 
     def remove_segment(self):
-        """Verkürzt die Zeit um ein Segment (das letzte wird entfernt)."""
-        if self.segment_count <= MIN_SEGMENTS:
-            return
-        self.segment_count -= 1
-        if self.elapsed > self.total_seconds:
-            self.elapsed = self.total_seconds
-        if self.elapsed >= self.total_seconds:
-            self.finished = True
-            self.running = False
-        self.draw()
+        if self.timer.remove_segment():
+            self.refresh()
 
     # ------------------------------------------------------------------
     # Zeit-Update
     # ------------------------------------------------------------------
-    def _loop(self):
-        if self.running and not self.finished:
-            now = time.monotonic()
-            dt = now - self.last_tick
-            self.last_tick = now
-            self.elapsed = min(self.total_seconds, self.elapsed + dt)
-            if self.elapsed >= self.total_seconds:
-                self.finished = True
-                self.running = False
+    # Es gibt keinen festen Takt: Nach jedem Frame wird genau der Moment
+    # geplant, in dem das aktive Segment die nächste Stufe des Farbverlaufs
+    # erreicht. Pausiert oder abgelaufen wird gar nichts geplant - Tasten
+    # und Größenänderungen stoßen über refresh() wieder an.
+    def refresh(self):
+        """Zeit nachführen, neu zeichnen und den nächsten Frame planen."""
+        self.timer.advance()
+        if self.stats:
+            started = time.perf_counter()
             self.draw()
-        # ~30 Bilder pro Sekunde reicht für ein ruhiges, weiches Einfärben
-        self.root.after(33, self._loop)
+            self.stats.add_draw(time.perf_counter() - started)
+        else:
+            self.draw()
+        self._schedule()
+
+    def _schedule(self):
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+        if not self.timer.ticking:
+            return
+        delay_ms = self.timer.next_frame_delay()
+        self.deadline = self.timer.clock() + delay_ms / 1000
+        self.after_id = self.root.after(delay_ms, self._loop)
+
+    def _loop(self):
+        self.after_id = None
+        if self.stats:
+            self.stats.add_jitter(self.timer.clock() - self.deadline)
+        self.refresh()
 
     # ------------------------------------------------------------------
     # Zeichnen
     # ------------------------------------------------------------------
     def draw(self):
+        timer = self.timer
         # Hintergrund wechselt auf ein ruhiges Grün, sobald die Zeit um ist
-        bg = BG_DONE_COLOR if self.finished else BG_COLOR
-        self.canvas.configure(bg=bg)
-        self.root.configure(bg=bg)
+        bg = BG_DONE_COLOR if timer.finished else BG_COLOR
+        if bg != self.bg:
+            self.bg = bg
+            self.canvas.configure(bg=bg)
+            self.root.configure(bg=bg)
 
-        self.canvas.delete("all")
         width = self.canvas.winfo_width()
         height = self.canvas.winfo_height()
         if width <= 1 or height <= 1:
             return
 
-        n = self.segment_count
-        progress = 0.0 if self.total_seconds <= 0 else self.elapsed / self.total_seconds
-        progress = max(0.0, min(1.0, progress))
-        lit_units = progress * n  # z.B. 3.4 -> 3 volle Segmente + Segment 4 zu 40%
+        n = timer.segment_count
+        if self.layout != (width, height, n):
+            self._build(width, height, n)
+
+        lit_units = timer.lit_units
+
+        # Nur Segmente umfärben, deren Farbe sich wirklich geändert hat -
+        # während der Timer läuft, ist das höchstens das gerade aktive.
+        for i, item in enumerate(self.segment_items):
+            # Ist die Zeit abgelaufen, bleiben alle Segmente einfach an
+            # (volles Grün) - es gibt keine gesonderte "fertig"-Farbe mehr.
+            fill_amount = 1.0 if timer.finished else lit_units - i
+            color = segment_color(fill_amount)
+            if color != self.segment_colors[i]:
+                self.segment_colors[i] = color
+                self.canvas.itemconfigure(item, fill=color)
+
+        # sehr dezenter Hinweis, nur solange noch nicht gestartet wurde
+        show_hint = not timer.running and not timer.finished and timer.elapsed == 0
+        if show_hint != self.hint_visible:
+            self.hint_visible = show_hint
+            self.canvas.itemconfigure(self.hint_item, state="normal" if show_hint else "hidden")
+
+    def _build(self, width, height, n):
+        """Legt Rahmen, Segmente und Hinweistext für diese Größe neu an."""
+        self.canvas.delete("all")
+        self.layout = (width, height, n)
 
         avail_width = width - 2 * MARGIN - GAP * (n - 1)
         seg_width = max(4, avail_width / n)
@@ -237,40 +433,23 @@ class TimerApp:
             fill="", outline=FRAME_COLOR, width=FRAME_WIDTH,
         )
 
+        # Alle Segmente starten "aus"; draw() färbt danach die leuchtenden um
+        self.segment_items = []
         x = MARGIN
         for i in range(n):
-            # Ist die Zeit abgelaufen, bleiben alle Segmente einfach an
-            # (volles Grün) - es gibt keine gesonderte "fertig"-Farbe mehr.
-            fill_amount = 1.0 if self.finished else max(0.0, min(1.0, lit_units - i))
-
-            if fill_amount <= 0:
-                color = SEGMENT_OFF
-            elif fill_amount >= 1:
-                color = SEGMENT_ON
-            else:
-                color = lerp_color(SEGMENT_OFF, SEGMENT_ON, fill_amount)
-
             x1, y1, x2, y2 = x, y0, x + seg_width, y0 + seg_height
             radius = min(14, seg_height / 2, seg_width / 2)
-            self._round_rect(x1, y1, x2, y2, radius, fill=color, outline="")
-
+            self.segment_items.append(self._round_rect(x1, y1, x2, y2, radius, fill=SEGMENT_OFF, outline=""))
             x += seg_width + GAP
+        self.segment_colors = [SEGMENT_OFF] * n
 
-        # sehr dezenter Hinweis, nur solange noch nicht gestartet wurde
-        if not self.running and not self.finished and self.elapsed == 0:
-            self.canvas.create_text(
-                width / 2, y0 + seg_height + 40,
-                text="Leertaste zum Starten   ·   +/- zum Anpassen der Zeit",
-                fill="#4a4f5a",
-                font=("Helvetica", 12),
-            )
-        elif self.finished:
-            self.canvas.create_text(
-                width / 2, y0 + seg_height + 40,
-                text="",
-                fill="#4a4f5a",
-                font=("Helvetica", 12),
-            )
+        self.hint_item = self.canvas.create_text(
+            width / 2, y0 + seg_height + 40,
+            text="Leertaste zum Starten   ·   +/- zum Anpassen der Zeit",
+            fill="#4a4f5a",
+            font=("Helvetica", 12),
+        )
+        self.hint_visible = True
 
     def _round_rect(self, x1, y1, x2, y2, r, **kwargs):
         points = [
@@ -303,6 +482,10 @@ def parse_args():
         ),
     )
     parser.add_argument("--fullscreen", action="store_true", help="Direkt im Vollbild starten")
+    parser.add_argument(
+        "--stats", action="store_true",
+        help="Zeichenzeit und Jitter pro Frame messen und beim Beenden als Histogramm ausgeben",
+    )
     args = parser.parse_args()
 
     if args.seconds is not None:
@@ -319,14 +502,17 @@ def parse_args():
     else:
         segments = DEFAULT_SEGMENTS_FALLBACK
 
-    return total_seconds, segments, args.fullscreen
+    return total_seconds, segments, args.fullscreen, args.stats
 
 
 def main():
-    total_seconds, segments, start_fullscreen = parse_args()
+    total_seconds, segments, start_fullscreen, with_stats = parse_args()
+    stats = FrameStats() if with_stats else None
     root = tk.Tk()
-    TimerApp(root, total_seconds, segments, start_fullscreen)
+    TimerApp(root, total_seconds, segments, start_fullscreen, stats=stats)
     root.mainloop()
+    if stats:
+        print(stats.report(), file=sys.stderr)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Benchmark für segment_timer.py
+
+Simuliert lange Timer-Sitzungen mit einer von Hand vorgestellten Uhr, es
+wird also nicht wirklich gewartet. Für jede Kombination aus Dauer und
+Segmentanzahl wird gemessen:
+
+    model    nur TimerModel: Anzahl Frames und Rechenzeit pro Frame
+    render   TimerApp auf einem echten Tk-Canvas: Zeichenzeit pro Frame
+             (draw + update_idletasks), braucht einen Bildschirm/DISPLAY
+
+Zum Vergleich wird mit angegeben, wie viele Frames der frühere feste
+33-ms-Takt in derselben Zeit gezeichnet hätte. Die Ergebnisse landen als
+JSON-Datei, damit man Versionen und Rechner vergleichen kann.
+
+Beispiel:
+    python segment_timer_benchmark.py --durations 300 3600 28800 --segments 4 60 \\
+        --output timer_bench.json
+"""
+
+import argparse
+import json
+import platform
+import time
+import tkinter as tk
+from datetime import datetime
+
+import segment_timer as st
+
+DEFAULT_DURATIONS = [300, 3600, 8 * 3600]   # 5 min bis zu einem ganzen Arbeitstag
+DEFAULT_SEGMENTS = [4, 10, 60]
+FIXED_TICK = 0.033                          # früherer fester Takt von _loop
+
+
+class ManualClock:
+    """Monotone Uhr, die nur weiterläuft, wenn man sie vorstellt."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def run_model(total_seconds, segments):
+    clock = ManualClock()
+    timer = st.TimerModel(total_seconds, segments, clock)
+    timer.toggle_running()
+
+    frames = 0
+    start = time.perf_counter()
+    while timer.ticking:
+        clock.advance(timer.next_frame_delay() / 1000)
+        timer.advance()
+        frames += 1
+    wall = time.perf_counter() - start
+    return {"frames": frames, "us_per_frame": wall / frames * 1e6 if frames else None}
+
+
+def run_render(total_seconds, segments, size):
+    clock = ManualClock()
+    stats = st.FrameStats()
+    root = tk.Tk()
+    app = None
+    try:
+        root.geometry(size)
+        root.update()
+        app = st.TimerApp(root, total_seconds, segments, False, clock=clock)
+        root.update()
+        app.toggle_running()
+
+        frames = 0
+        while app.timer.ticking:
+            clock.advance(app.deadline - clock())
+            # Der Frame wird hier von Hand ausgelöst: den dafür geplanten Tk-Timer abbrechen,
+            # sonst bleibt pro Frame einer liegen und Tks Timerliste wird immer länger
+            if app.after_id is not None:
+                root.after_cancel(app.after_id)
+            started = time.perf_counter()
+            app._loop()
+            root.update_idletasks()     # das eigentliche Neuzeichnen macht Tk im Leerlauf
+            stats.add_draw(time.perf_counter() - started)
+            frames += 1
+    finally:
+        # Noch geplante after()-Aufrufe abbrechen, sonst laufen sie ins zerstörte Fenster
+        if app is not None and app.after_id is not None:
+            root.after_cancel(app.after_id)
+            app.after_id = None
+        root.destroy()
+
+    ordered = sorted(stats.draw_ms)
+    return {
+        "frames": frames,
+        "mean_ms": sum(ordered) / len(ordered) if ordered else None,
+        "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] if ordered else None,
+        "max_ms": ordered[-1] if ordered else None,
+        "histogram_ms": dict(zip([str(b) for b in st.STATS_BUCKETS_MS] + ["inf"],
+                                 st.FrameStats.histogram(stats.draw_ms))),
+    }
+
+
+def format_row(result):
+    head = f"{result['duration']:>8g}s {result['segments']:>4} Segmente"
+    model = result["model"]
+    line = (f"{head}  {model['frames']:>7} Frames (fest 33 ms: {result['fixed_tick_frames']:>8})"
+            f"  Modell {model['us_per_frame']:.2f} µs/Frame")
+    render = result.get("render")
+    if render is None:
+        return line
+    if "error" in render:
+        return f"{line}  Zeichnen FEHLER: {render['error']}"
+    return f"{line}  Zeichnen {render['mean_ms']:.3f} ms/Frame (p99 {render['p99_ms']:.3f} ms)"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark für segment_timer.py mit simulierter Uhr")
+    parser.add_argument(
+        "--durations", nargs="+", type=float, default=DEFAULT_DURATIONS,
+        help=f"Timerlängen in Sekunden (Standard: {' '.join(map(str, DEFAULT_DURATIONS))})",
+    )
+    parser.add_argument(
+        "--segments", nargs="+", type=int, default=DEFAULT_SEGMENTS,
+        help=f"Segmentanzahlen (Standard: {' '.join(map(str, DEFAULT_SEGMENTS))})",
+    )
+    parser.add_argument("--size", default="1920x1080", help="Fenstergröße für render (Standard: 1920x1080)")
+    parser.add_argument("--no-render", action="store_true", help="Nur das Modell messen, kein Tk-Fenster öffnen")
+    parser.add_argument(
+        "--output", "-o", default="segment_timer_benchmark.json",
+        help="JSON-Datei für die Ergebnisse (Standard: segment_timer_benchmark.json)",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    results = []
+    for duration in args.durations:
+        for segments in args.segments:
+            result = {
+                "duration": duration,
+                "segments": segments,
+                "fixed_tick_frames": int(duration / FIXED_TICK),
+                "model": run_model(duration, segments),
+            }
+            if not args.no_render:
+                try:
+                    result["render"] = run_render(duration, segments, args.size)
+                except tk.TclError as e:
+                    # z.B. kein DISPLAY - das Modell ist trotzdem gemessen
+                    result["render"] = {"error": str(e)}
+            print(format_row(result), flush=True)
+            results.append(result)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "tk": tk.TkVersion,
+        "gradient_steps": st.GRADIENT_STEPS,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nErgebnisse in {args.output} geschrieben")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,25 +6,152 @@ A new output file is created whenever a line containing the specified split
 marker is encountered. The matching line becomes the first line of the new file.
 
 Lines before the first occurrence of the split marker are ignored.
+
+With --binary the input is memory-mapped and split on raw bytes: parts are
+byte-exact copies of the input (no decoding, no newline translation) and are
+written with os.copy_file_range/os.sendfile where available. --jobs scans
+byte ranges of the input in parallel processes and writes parts concurrently.
+
+Instead of writing all parts, "index" lists where each part starts and
+"extract" copies single parts using that index:
+
+    python split_file.py index log.txt "marker" -o log.index.json
+    python split_file.py extract log.txt log.index.json 3 7-9 -o parts
+
+Without a command the input is split ("split" is the default command).
+An input file that is itself named "index" or "extract" has to be split
+with the explicit command: python split_file.py split index out "marker".
+
+gzip, xz and bzip2 compressed input is recognized by its first bytes and
+decompressed on the fly (offsets then refer to the decompressed data).
+--compress writes every part compressed.
+
+--chunks, --chunk-bytes and --chunk-lines write roughly equal chunks
+instead of one file per marker line. Chunks are still only cut at marker
+lines (or, without a marker, at any line boundary), and a manifest.json
+lists the size of every chunk:
+
+    python split_file.py --chunks 16 log.txt chunks "marker"
+    python split_file.py --chunk-bytes 256M log.txt chunks
 """
 
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 import argparse
+import bz2
+import csv
+import errno
+import gzip
+import io
+import json
+import lzma
+import mmap
+import os
+import re
 import sys
 
 
-def split_file(input_file: Path, output_dir: Path, split_marker: str) -> int:
+COPY_CHUNK = 1 << 30    # bytes per copy_file_range/sendfile call
+PART_DIGITS = 3         # part_001.txt; widened automatically for more parts
+FIRST_LINE_MAX = 4096   # bytes of a part's first line stored in the index
+INDEX_FIELDS = ["part", "offset", "length", "first_line"]
+MANIFEST_NAME = "manifest.json"
+COMMANDS = ("split", "index", "extract")
+# Same units (and parse_size) as mp4_to_mp3.py, test_split_file.py keeps them in sync
+SIZE_UNITS = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4}
+MIN_SCAN_RANGE = 16 << 20       # smallest byte range worth a parallel scan task
+SCAN_RANGES_PER_JOB = 4         # more ranges than jobs evens out uneven ranges
+READ_BUFFER = 4 << 20           # read size for (decompressed) streams
+WRITE_CHUNK = 4 << 20           # slice size when a part is written through a compressor
+FIND_LINES = 8                  # up to this many newlines, find() is cheaper than counting
+
+# Compressed input is recognized by its magic bytes, not by its name
+COMPRESSION_MAGIC = {
+    "gz": re.compile(rb"\x1f\x8b"),
+    "xz": re.compile(rb"\xfd7zXZ\x00"),
+    # "BZh", block size 1-9, then a block header or (empty stream) the end-of-stream marker
+    "bz2": re.compile(rb"BZh[1-9](?:1AY&SY|\x17rE8P\x90)"),
+}
+MAGIC_BYTES = 10        # bytes read to recognize the compression
+COMPRESSORS = {
+    "gz": lambda path, mode: gzip.open(path, mode, compresslevel=6),
+    "xz": lambda path, mode: lzma.open(path, mode),
+    "bz2": lambda path, mode: bz2.open(path, mode),
+}
+
+# Errors that mean "this copy method does not work here", not "the copy failed"
+# (copy_file_range fails with EBADF for an O_APPEND target such as stdout
+# redirected with ">>"; a really bad descriptor still fails in os.write)
+COPY_FALLBACK_ERRNOS = {
+    errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.ENOTSOCK,
+    errno.EBADF,
+}
+
+
+def part_width(count: int) -> int:
+    """Digits in part names: at least 3, more if needed so names sort in order."""
+    return max(PART_DIGITS, len(str(count)))
+
+
+def part_name(part: int, width: int = PART_DIGITS, compress: str = None, prefix: str = "part") -> str:
+    name = f"{prefix}_{part:0{width}d}.txt"
+    return f"{name}.{compress}" if compress else name
+
+
+def widen_part_names(output_dir: Path, count: int, compress: str = None) -> None:
+    """Rename part_001.txt ... to the width needed for count parts."""
+    width = part_width(count)
+    if width == PART_DIGITS:
+        return
+    for part in range(1, 10 ** (width - 1)):
+        (output_dir / part_name(part, compress=compress)).rename(
+            output_dir / part_name(part, width, compress)
+        )
+
+
+def detect_compression(input_file: Path):
+    """Name of the compression of a file ("gz", "xz", "bz2") or None."""
+    with input_file.open("rb") as f:
+        head = f.read(MAGIC_BYTES)
+    for name, magic in COMPRESSION_MAGIC.items():
+        if magic.match(head):
+            return name
+    return None
+
+
+def open_input(input_file: Path, compression: str = None):
+    """Binary stream of the (decompressed) input, read in large blocks."""
+    if compression is None:
+        return input_file.open("rb", buffering=READ_BUFFER)
+    return io.BufferedReader(COMPRESSORS[compression](input_file, "rb"), buffer_size=READ_BUFFER)
+
+
+def open_output(path: Path, mode: str, compress: str = None):
+    """Open a part for writing ("w" or "wb"), compressed if compress is set."""
+    if compress is None:
+        if "b" in mode:
+            return path.open(mode)
+        return path.open(mode, encoding="utf-8")
+    if "b" in mode:
+        return COMPRESSORS[compress](path, mode)
+    return io.TextIOWrapper(COMPRESSORS[compress](path, "wb"), encoding="utf-8")
+
+
+def split_file(input_file: Path, output_dir: Path, split_marker: str, compress: str = None) -> int:
     """
     Split a text file into multiple files based on a marker line.
 
     Parameters
     ----------
     input_file : Path
-        Path to the input text file.
+        Path to the input text file, optionally gzip/xz/bzip2 compressed.
     output_dir : Path
         Directory where the output files will be written.
     split_marker : str
         Text that marks the beginning of a new output file.
+    compress : str, optional
+        Compress every part with "gz", "xz" or "bz2".
 
     Returns
     -------
@@ -37,16 +164,15 @@ def split_file(input_file: Path, output_dir: Path, split_marker: str) -> int:
     outfile = None
 
     try:
-        with input_file.open("r", encoding="utf-8", errors="ignore") as infile:
+        stream = open_input(input_file, detect_compression(input_file))
+        with io.TextIOWrapper(stream, encoding="utf-8", errors="ignore") as infile:
             for line in infile:
                 if split_marker in line:
                     if outfile is not None:
                         outfile.close()
 
                     part += 1
-                    outfile = (
-                        output_dir / f"part_{part:03d}.txt"
-                    ).open("w", encoding="utf-8")
+                    outfile = open_output(output_dir / part_name(part, compress=compress), "w", compress)
 
                 if outfile is not None:
                     outfile.write(line)
@@ -55,56 +181,879 @@ def split_file(input_file: Path, output_dir: Path, split_marker: str) -> int:
         if outfile is not None:
             outfile.close()
 
+    # The number of parts is only known now; rename so that names keep sorting
+    widen_part_names(output_dir, part, compress)
+    return part
+
+
+def find_marker_lines(buf, marker: bytes, start: int = 0, end: int = None) -> list:
+    """
+    Find the lines of a buffer that contain a marker.
+
+    Parameters
+    ----------
+    buf : bytes-like or mmap
+        Data to search.
+    marker : bytes
+        Byte string to look for.
+    start, end : int, optional
+        Only occurrences beginning in buf[start:end] count. An occurrence
+        may extend past end, so adjacent ranges together find every
+        occurrence exactly once.
+
+    Returns
+    -------
+    list of int
+        Offsets of the first byte of every line containing the marker,
+        in ascending order. The line may begin before start.
+    """
+    size = len(buf)
+    end = size if end is None else min(end, size)
+    limit = min(size, end + max(len(marker), 1) - 1)
+
+    offsets = []
+    pos = buf.find(marker, start, limit)
+    while pos != -1 and pos < end:
+        offsets.append(buf.rfind(b"\n", 0, pos) + 1)
+        # Further occurrences on the same line do not start a new part
+        line_end = buf.find(b"\n", pos)
+        if line_end == -1:
+            break
+        pos = buf.find(marker, line_end + 1, limit)
+    return offsets
+
+
+def _scan_range(input_file: Path, marker: bytes, start: int, end: int) -> list:
+    with input_file.open("rb") as infile:
+        with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            return find_marker_lines(buf, marker, start, end)
+
+
+def find_marker_lines_parallel(input_file: Path, size: int, marker: bytes, jobs: int) -> list:
+    """
+    Same as find_marker_lines on the whole file, using jobs processes.
+
+    The file is cut into byte ranges that are scanned independently (each
+    process maps the file itself). A line with occurrences in two ranges is
+    reported by both, so the merged list drops repeated offsets.
+    """
+    range_size = max(MIN_SCAN_RANGE, -(-size // (jobs * SCAN_RANGES_PER_JOB)))
+    starts = list(range(0, size, range_size))
+    ends = starts[1:] + [size]
+
+    offsets = []
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        results = executor.map(_scan_range, [input_file] * len(starts), [marker] * len(starts), starts, ends)
+        for found in results:
+            for offset in found:
+                if not offsets or offset > offsets[-1]:
+                    offsets.append(offset)
+    return offsets
+
+
+def _copy_file_range(src_fd, dst_fd, offset, count):
+    return os.copy_file_range(src_fd, dst_fd, count, offset)
+
+
+def _sendfile(src_fd, dst_fd, offset, count):
+    return os.sendfile(dst_fd, src_fd, offset, count)
+
+
+def copy_range(src_fd: int, dst_fd: int, offset: int, length: int, buf) -> None:
+    """
+    Append length bytes starting at offset of src_fd to dst_fd.
+
+    copy_file_range copies inside the kernel (and may share blocks on
+    copy-on-write filesystems), sendfile is the older kernel-side copy.
+    If neither is available, or both refuse this pair of files, the slice
+    of buf (the mmap of src_fd) is written.
+    """
+    end = offset + length
+    for copy in (_copy_file_range, _sendfile):
+        try:
+            while offset < end:
+                copied = copy(src_fd, dst_fd, offset, min(end - offset, COPY_CHUNK))
+                if copied == 0:
+                    break
+                offset += copied
+        except AttributeError:
+            continue        # not available on this platform
+        except OSError as e:
+            if e.errno not in COPY_FALLBACK_ERRNOS:
+                raise
+            continue
+        if offset >= end:
+            return
+
+    with memoryview(buf) as view:
+        while offset < end:
+            offset += os.write(dst_fd, view[offset:min(end, offset + COPY_CHUNK)])
+
+
+def write_part(path: Path, src_fd: int, offset: int, length: int, buf, compress: str = None) -> None:
+    if compress:
+        # zlib, lzma and bz2 release the GIL, so concurrent parts compress in parallel
+        with COMPRESSORS[compress](path, "wb") as out, memoryview(buf) as view:
+            for start in range(offset, offset + length, WRITE_CHUNK):
+                out.write(view[start:min(offset + length, start + WRITE_CHUNK)])
+        return
+
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        copy_range(src_fd, fd, offset, length, buf)
+    finally:
+        os.close(fd)
+
+
+def copy_stream(stream, dst, offset: int, length: int) -> None:
+    """Copy length bytes at offset of a (decompressing) stream to a binary file."""
+    stream.seek(offset)     # forward seeks decompress and discard, backward ones restart
+    while length > 0:
+        data = stream.read(min(length, READ_BUFFER))
+        if not data:
+            raise ValueError(f"input ends before offset {offset + length}")
+        dst.write(data)
+        length -= len(data)
+
+
+def find_parts(input_file: Path, buf, marker: bytes, jobs: int = 1) -> list:
+    """
+    Byte ranges of the parts of a memory-mapped file.
+
+    Returns a list of (offset, length) tuples, one per marker line; each
+    part runs up to the next marker line or the end of the file.
+    """
+    size = len(buf)
+    if jobs > 1 and size > MIN_SCAN_RANGE:
+        offsets = find_marker_lines_parallel(input_file, size, marker, jobs)
+    else:
+        offsets = find_marker_lines(buf, marker)
+    ends = offsets[1:] + [size]
+    return [(start, end - start) for start, end in zip(offsets, ends)]
+
+
+def split_stream(stream, output_dir: Path, marker: bytes, compress: str = None) -> int:
+    """Binary split of a stream that cannot be memory-mapped, line by line."""
+    part = 0
+    outfile = None
+    try:
+        for line in stream:
+            if marker in line:
+                if outfile is not None:
+                    outfile.close()
+                part += 1
+                outfile = open_output(output_dir / part_name(part, compress=compress), "wb", compress)
+            if outfile is not None:
+                outfile.write(line)
+    finally:
+        if outfile is not None:
+            outfile.close()
+
+    widen_part_names(output_dir, part, compress)
     return part
 
 
-def parse_arguments():
+def split_file_binary(input_file: Path, output_dir: Path, split_marker: str, jobs: int = 1,
+                      compress: str = None) -> int:
+    """
+    Split a file into multiple files based on a marker line, byte-exact.
+
+    The input is memory-mapped and searched for the UTF-8 encoded marker.
+    Every part is one contiguous range of the input, from the start of a
+    marker line to the start of the next one, and is copied as a whole.
+    Compressed input cannot be mapped; it is decompressed and split as a
+    stream instead.
+
+    Parameters
+    ----------
+    input_file : Path
+        Path to the input file, optionally gzip/xz/bzip2 compressed.
+    output_dir : Path
+        Directory where the output files will be written.
+    split_marker : str
+        Text that marks the beginning of a new output file.
+    jobs : int
+        Processes scanning for the marker and threads writing parts. The
+        output does not depend on it. Not used for compressed input.
+    compress : str, optional
+        Compress every part with "gz", "xz" or "bz2".
+
+    Returns
+    -------
+    int
+        Number of output files created.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    marker = split_marker.encode("utf-8")
+
+    compression = detect_compression(input_file)
+    if compression:
+        with open_input(input_file, compression) as stream:
+            return split_stream(stream, output_dir, marker, compress)
+
+    with input_file.open("rb") as infile:
+        if os.fstat(infile.fileno()).st_size == 0:
+            return 0
+
+        with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if hasattr(buf, "madvise"):
+                buf.madvise(mmap.MADV_SEQUENTIAL)
+
+            parts = find_parts(input_file, buf, marker, jobs)
+            write_parts(infile.fileno(), buf, parts, output_dir, jobs, compress)
+
+    return len(parts)
+
+
+def write_parts(src_fd: int, buf, parts: list, output_dir: Path, jobs: int = 1,
+                compress: str = None, prefix: str = "part") -> list:
+    """Write (offset, length) ranges of a mapped file as numbered files; returns the names."""
+    width = part_width(len(parts))
+    names = [part_name(part, width, compress, prefix) for part in range(1, len(parts) + 1)]
+
+    def write(item):
+        name, (offset, length) = item
+        write_part(output_dir / name, src_fd, offset, length, buf, compress)
+
+    if jobs > 1:
+        # The copies run in the kernel (or in os.write), without the GIL
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            list(executor.map(write, zip(names, parts)))
+    else:
+        for item in zip(names, parts):
+            write(item)
+    return names
+
+
+def count_lines(buf, start: int, end: int) -> int:
+    """Newlines in buf[start:end]; mmap has no count(), so count copies of small windows."""
+    return sum(buf[pos:min(end, pos + READ_BUFFER)].count(b"\n") for pos in range(start, end, READ_BUFFER))
+
+
+def find_line_end(buf, start: int, lines: int, step: int) -> int:
+    """
+    Position just after the lines-th newline at or after start, or -1.
+
+    Newlines are counted, not found one by one: windows starting with step
+    bytes (doubling) are counted until one holds the wanted newline, which
+    is then narrowed down by halving that window until at most FIND_LINES
+    newlines are left to find(). Every byte is counted only a few times,
+    however short the lines.
+    """
+    def find_nth(data, lines, pos, end):
+        for _ in range(lines):
+            pos = data.find(b"\n", pos, end)
+            if pos == -1:
+                return -1
+            pos += 1
+        return pos
+
+    size = len(buf)
+    while True:
+        if lines <= FIND_LINES:
+            return find_nth(buf, lines, start, size)
+        end = min(size, start + step)
+        window = buf[start:end]
+        count = window.count(b"\n")
+        if count >= lines:
+            break
+        if end == size:
+            return -1
+        lines -= count
+        start, step = end, step * 2
+    low, high = 0, len(window)
+    while lines > FIND_LINES:
+        middle = (low + high) // 2
+        count = window.count(b"\n", low, middle)
+        if count >= lines:
+            high = middle
+        else:
+            lines -= count
+            low = middle
+    return start + find_nth(window, lines, low, high)
+
+
+def nearest_index(values: list, target: float, low: int) -> int:
+    """Index of the value closest to target among values[low + 1:] (sorted)."""
+    i = bisect_left(values, target, low + 1)
+    if i == len(values):
+        return i - 1
+    if i > low + 1 and target - values[i - 1] <= values[i] - target:
+        return i - 1
+    return i
+
+
+def balanced_cuts(weights: list, total: float, chunks: int = None, budget: float = None) -> list:
+    """
+    Choose chunk starts among candidate cut points.
+
+    weights[i] is the cumulative size (bytes or lines) in front of candidate
+    i, total the size of everything. Either chunks (equal shares) or budget
+    (size per chunk) is given; each chunk ends at the candidate closest to
+    its target. Returns indices into weights, always starting with 0.
+    """
+    cuts = [0]
+    if chunks:
+        start = weights[0]
+        for k in range(1, chunks):
+            if cuts[-1] + 1 >= len(weights):
+                break
+            i = nearest_index(weights, start + (total - start) * k / chunks, cuts[-1])
+            if weights[i] < total:
+                cuts.append(i)
+    else:
+        while cuts[-1] + 1 < len(weights) and weights[cuts[-1]] + budget < total:
+            cuts.append(nearest_index(weights, weights[cuts[-1]] + budget, cuts[-1]))
+    return cuts
+
+
+def snap_to_line(buf, pos: int, low: int) -> int:
+    """Line start closest to pos that lies after low (len(buf) if there is none)."""
+    size = len(buf)
+    after = buf.find(b"\n", pos)
+    after = size if after == -1 else after + 1
+    before = buf.rfind(b"\n", low, pos) + 1
+    if before > low and pos - before <= after - pos:
+        return before
+    return after
+
+
+def line_chunks(buf, chunks: int = None, chunk_bytes: int = None, chunk_lines: int = None) -> list:
+    """Chunk starts for a file without marker: every line boundary may be a cut."""
+    size = len(buf)
+    starts = [0]
+    if chunk_lines:
+        step = chunk_lines * 32
+        while True:
+            pos = find_line_end(buf, starts[-1], chunk_lines, step)
+            if pos == -1 or pos >= size:
+                return starts
+            step = (pos - starts[-1]) * 9 // 8     # the next chunk is probably about as long
+            starts.append(pos)
+
+    targets = ((size * k / chunks) for k in range(1, chunks)) if chunks else None
+    while True:
+        if targets is None:
+            target = starts[-1] + chunk_bytes
+        else:
+            target = next(targets, None)
+            if target is None:
+                return starts
+        if target >= size:
+            return starts
+        cut = snap_to_line(buf, int(target), starts[-1])
+        if cut >= size:
+            return starts
+        if cut > starts[-1]:
+            starts.append(cut)
+
+
+def marker_chunks(buf, offsets: list, chunks: int = None, chunk_bytes: int = None,
+                  chunk_lines: int = None) -> list:
+    """Chunk starts chosen among marker line offsets."""
+    if chunk_lines:
+        weights = [0]
+        for start, end in zip(offsets, offsets[1:]):
+            weights.append(weights[-1] + count_lines(buf, start, end))
+        total = weights[-1] + count_lines(buf, offsets[-1], len(buf))
+        cuts = balanced_cuts(weights, total, budget=chunk_lines)
+    else:
+        cuts = balanced_cuts(offsets, len(buf), chunks=chunks, budget=chunk_bytes)
+    return [offsets[i] for i in cuts]
+
+
+def chunk_file(input_file: Path, output_dir: Path, split_marker: str = None, chunks: int = None,
+               chunk_bytes: int = None, chunk_lines: int = None, jobs: int = 1,
+               compress: str = None) -> dict:
+    """
+    Split a file into chunks of roughly equal size for parallel processing.
+
+    Exactly one of chunks, chunk_bytes and chunk_lines should be given.
+    With a marker, chunks begin only at marker lines (a chunk holds one or
+    more whole sections, text before the first marker is skipped as in
+    split_file); without one, chunks begin at line boundaries. Chunks are
+    written byte-exact like split_file_binary, and a manifest of all
+    chunks is written to output_dir.
+
+    Parameters
+    ----------
+    input_file : Path
+        Path to the input file (uncompressed, it is memory-mapped).
+    output_dir : Path
+        Directory where the chunks and the manifest will be written.
+    split_marker : str, optional
+        Text of the lines chunks may begin with.
+    chunks : int, optional
+        Number of chunks of about equal size in bytes.
+    chunk_bytes, chunk_lines : int, optional
+        Target size of every chunk in bytes or lines.
+    jobs : int
+        Processes scanning for the marker and threads writing chunks.
+    compress : str, optional
+        Compress every chunk with "gz", "xz" or "bz2".
+
+    Returns
+    -------
+    dict
+        The manifest: input, mode and one entry per chunk with its file
+        name, offset, length, number of lines and (with a marker) sections.
+    """
+    if detect_compression(input_file):
+        raise ValueError("chunking needs an uncompressed input file (it is memory-mapped)")
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest = {
+        "input": str(input_file),
+        "size": input_file.stat().st_size,
+        "marker": split_marker,
+        "mode": {"chunks": chunks, "chunk_bytes": chunk_bytes, "chunk_lines": chunk_lines},
+        "chunks": [],
+    }
+
+    with input_file.open("rb") as infile:
+        size = manifest["size"]
+        offsets = []
+        ranges = []
+        if size:
+            with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                if split_marker:
+                    offsets = [offset for offset, _ in find_parts(input_file, buf, split_marker.encode("utf-8"), jobs)]
+                    starts = marker_chunks(buf, offsets, chunks, chunk_bytes, chunk_lines) if offsets else []
+                else:
+                    starts = line_chunks(buf, chunks, chunk_bytes, chunk_lines)
+
+                ends = starts[1:] + [size]
+                ranges = [(start, end - start) for start, end in zip(starts, ends)]
+                names = write_parts(infile.fileno(), buf, ranges, output_dir, jobs, compress, prefix="chunk")
+
+                for number, (name, (offset, length)) in enumerate(zip(names, ranges), start=1):
+                    entry = {
+                        "chunk": number,
+                        "file": name,
+                        "offset": offset,
+                        "length": length,
+                        "lines": count_lines(buf, offset, offset + length),
+                    }
+                    if split_marker:
+                        entry["sections"] = (bisect_left(offsets, offset + length)
+                                             - bisect_left(offsets, offset))
+                    manifest["chunks"].append(entry)
+
+    with (output_dir / MANIFEST_NAME).open("w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    return manifest
+
+
+def build_index(input_file: Path, split_marker: str, jobs: int = 1) -> dict:
+    """
+    Find the parts of a file without writing them.
+
+    Parameters
+    ----------
+    input_file : Path
+        Path to the input file.
+    split_marker : str
+        Text that marks the beginning of a new part.
+    jobs : int
+        Processes scanning for the marker.
+
+    Returns
+    -------
+    dict
+        The input's path, size and compression, the marker and a list of
+        parts, each with its number, byte offset, length in bytes and first
+        line. For compressed input, offsets, lengths and size refer to the
+        decompressed data and compressed_size is the size of the file.
+    """
+    compression = detect_compression(input_file)
+    index = {"input": str(input_file), "size": input_file.stat().st_size,
+             "compression": compression, "marker": split_marker, "parts": []}
+    if compression:
+        return build_index_stream(input_file, compression, index)
+    if index["size"] == 0:
+        return index
+
+    with input_file.open("rb") as infile:
+        with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            parts = find_parts(input_file, buf, split_marker.encode("utf-8"), jobs)
+            for part, (offset, length) in enumerate(parts, start=1):
+                line_end = buf.find(b"\n", offset, offset + min(length, FIRST_LINE_MAX))
+                first_line = buf[offset:line_end if line_end != -1 else offset + min(length, FIRST_LINE_MAX)]
+                index["parts"].append({
+                    "part": part,
+                    "offset": offset,
+                    "length": length,
+                    "first_line": first_line.decode("utf-8", errors="replace").rstrip("\r"),
+                })
+    return index
+
+
+def build_index_stream(input_file: Path, compression: str, index: dict) -> dict:
+    """build_index for compressed input: one pass over the decompressed lines."""
+    marker = index["marker"].encode("utf-8")
+    parts = index["parts"]
+    offset = 0
+    with open_input(input_file, compression) as stream:
+        for line in stream:
+            if marker in line:
+                if parts:
+                    parts[-1]["length"] = offset - parts[-1]["offset"]
+                parts.append({
+                    "part": len(parts) + 1,
+                    "offset": offset,
+                    "length": None,
+                    "first_line": line[:FIRST_LINE_MAX].decode("utf-8", errors="replace").rstrip("\r\n"),
+                })
+            offset += len(line)
+    if parts:
+        parts[-1]["length"] = offset - parts[-1]["offset"]
+    index["compressed_size"] = index["size"]
+    index["size"] = offset
+    return index
+
+
+def write_index(index: dict, output, index_format: str) -> None:
+    """Write an index as JSON (with the input's size and marker) or as CSV rows."""
+    if index_format == "csv":
+        writer = csv.DictWriter(output, fieldnames=INDEX_FIELDS)
+        writer.writeheader()
+        writer.writerows(index["parts"])
+    else:
+        json.dump(index, output, indent=2, ensure_ascii=False)
+        output.write("\n")
+
+
+def read_index(index_file: Path) -> dict:
+    """Read an index written by write_index; CSV indexes have no size or marker."""
+    with index_file.open("r", encoding="utf-8", newline="") as f:
+        if index_file.suffix.lower() == ".csv":
+            parts = [{field: row[field] if field == "first_line" else int(row[field]) for field in INDEX_FIELDS}
+                     for row in csv.DictReader(f)]
+            return {"size": None, "parts": parts}
+        return json.load(f)
+
+
+def parse_part_numbers(specs: list, count: int) -> list:
+    """Turn "3", "7-9" and "5-" into part numbers between 1 and count."""
+    numbers = []
+    for spec in specs:
+        first, dash, last = spec.partition("-")
+        first = int(first) if first else 1
+        last = (int(last) if last else count) if dash else first
+        if not 1 <= first <= last <= count:
+            raise ValueError(f"part '{spec}' is outside 1-{count}")
+        numbers.extend(range(first, last + 1))
+    return numbers
+
+
+def extract_parts(input_file: Path, index: dict, numbers: list, output_dir: Path = None) -> None:
+    """
+    Copy parts listed in an index out of the input file.
+
+    Every part is read directly at its offset, nothing else of the input is
+    touched. Parts go to output_dir, named like split_file_binary names
+    them, or one after another to stdout if output_dir is None.
+    Compressed input has to be decompressed up to the last requested part;
+    parts going to output_dir are extracted in one pass in input order.
+    """
+    parts = {row["part"]: row for row in index["parts"]}
+    width = part_width(len(parts))
+
+    compression = detect_compression(input_file)
+    if compression:
+        size = input_file.stat().st_size
+        if index.get("compressed_size") is not None and index["compressed_size"] != size:
+            raise ValueError(f"'{input_file}' has changed since the index was made "
+                             f"({index['compressed_size']} bytes then, {size} now)")
+        if output_dir is not None:
+            output_dir.mkdir(parents=True, exist_ok=True)
+            numbers = sorted(set(numbers))
+        stream = None
+        try:
+            for number in numbers:
+                row = parts[number]
+                if stream is None or row["offset"] < stream.tell():
+                    # Start over instead of seeking backward in a decompressing stream
+                    if stream is not None:
+                        stream.close()
+                    stream = open_input(input_file, compression)
+                if output_dir is None:
+                    copy_stream(stream, sys.stdout.buffer, row["offset"], row["length"])
+                else:
+                    with (output_dir / part_name(number, width)).open("wb") as out:
+                        copy_stream(stream, out, row["offset"], row["length"])
+        finally:
+            if stream is not None:
+                stream.close()
+        sys.stdout.flush()
+        return
+
+    with input_file.open("rb") as infile:
+        size = os.fstat(infile.fileno()).st_size
+        if index.get("size") is not None and index["size"] != size:
+            raise ValueError(f"'{input_file}' has changed since the index was made "
+                             f"({index['size']} bytes then, {size} now)")
+        if not numbers:
+            return
+
+        with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if output_dir is None:
+                sys.stdout.flush()
+                for number in numbers:
+                    row = parts[number]
+                    copy_range(infile.fileno(), sys.stdout.fileno(), row["offset"], row["length"], buf)
+                return
+
+            output_dir.mkdir(parents=True, exist_ok=True)
+            for number in numbers:
+                row = parts[number]
+                write_part(output_dir / part_name(number, width), infile.fileno(),
+                           row["offset"], row["length"], buf)
+
+
+def parse_size(text):
+    """Parse sizes like 500, 200k, 1.5G (binary units) into bytes."""
+    text = text.strip().lower().removesuffix("b")
+    number, unit = (text[:-1], text[-1]) if text and text[-1] in SIZE_UNITS else (text, "")
+    try:
+        return int(float(number) * SIZE_UNITS[unit])
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {text!r}")
+
+
+def parse_arguments(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # Without a command the script splits, as it always did. A file that is
+    # itself named "index" or "extract" needs the explicit "split" command.
+    if argv and argv[0] not in COMMANDS and argv[0] not in ("-h", "--help"):
+        argv = ["split"] + argv
+
     parser = argparse.ArgumentParser(
+        description="Split a large text file into multiple smaller files, or index "
+                    "its parts and extract single ones.",
+        epilog="Example:\n"
+               "  python split_file.py log.txt output "
+               "\"This is the beginning of a new file\"\n"
+               "  python split_file.py split index output \"marker\"   "
+               "(a file named like a command)",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    split = commands.add_parser(
+        "split",
+        help="Write one file per part (default when no command is given).",
         description=(
             "Split a large text file into multiple smaller files. "
             "A new file is created whenever a line containing the specified "
             "split marker is encountered. The matching line becomes the first "
             "line of the new output file."
         ),
-        epilog="Example:\n"
-               "  python split_file.py log.txt output "
-               "\"This is the beginning of a new file\"",
-        formatter_class=argparse.RawDescriptionHelpFormatter,
     )
 
-    parser.add_argument(
+    split.add_argument(
         "input_file",
         type=Path,
         help="Path to the input log file.",
     )
 
-    parser.add_argument(
+    split.add_argument(
         "output_dir",
         type=Path,
         help="Directory where the split log files will be written.",
     )
 
-    parser.add_argument(
+    split.add_argument(
         "split_marker",
         type=str,
-        help="Text that marks the beginning of a new output file.",
+        nargs="?",
+        help="Text that marks the beginning of a new output file. May be "
+             "left out with --chunks/--chunk-bytes/--chunk-lines to cut at "
+             "any line.",
+    )
+
+    chunking = split.add_mutually_exclusive_group()
+    chunking.add_argument(
+        "--chunks",
+        type=int,
+        metavar="N",
+        help="Write N chunks of about equal size instead of one file per marker.",
+    )
+    chunking.add_argument(
+        "--chunk-bytes",
+        type=parse_size,
+        metavar="SIZE",
+        help="Write chunks of about SIZE bytes each (e.g. 256M).",
+    )
+    chunking.add_argument(
+        "--chunk-lines",
+        type=int,
+        metavar="LINES",
+        help="Write chunks of about LINES lines each.",
     )
 
-    return parser.parse_args()
+    split.add_argument(
+        "--binary",
+        action="store_true",
+        help="Split on raw bytes using a memory map. Parts are byte-exact "
+             "copies of the input and much faster to write.",
+    )
+
+    split.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Scan for the marker in this many processes and write parts "
+             "concurrently (needs --binary, default: 1).",
+    )
+
+    split.add_argument(
+        "--compress",
+        choices=sorted(COMPRESSORS),
+        help="Write every part compressed (part_001.txt.gz, ...).",
+    )
+
+    index = commands.add_parser(
+        "index",
+        help="List where every part starts instead of writing the parts.",
+        description="List the byte offset, length and first line of every part "
+                    "instead of writing the parts.",
+    )
+    index.add_argument("input_file", type=Path, help="Path to the input log file.")
+    index.add_argument("split_marker", type=str, help="Text that marks the beginning of a new part.")
+    index.add_argument(
+        "--output",
+        "-o",
+        type=Path,
+        help="Index file (default: stdout). A .csv name selects CSV.",
+    )
+    index.add_argument(
+        "--format",
+        choices=["json", "csv"],
+        help="Index format (default: from the --output name, otherwise JSON).",
+    )
+    index.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Scan for the marker in this many processes (default: 1).",
+    )
+
+    extract = commands.add_parser(
+        "extract",
+        help="Copy single parts out of the input file using an index.",
+        description="Copy single parts out of the input file, using an index "
+                    "written by 'split_file.py index'.",
+    )
+    extract.add_argument("input_file", type=Path, help="Path to the input log file.")
+    extract.add_argument("index_file", type=Path, help="JSON or CSV index of the input file.")
+    extract.add_argument("parts", nargs="+", help="Part numbers or ranges, e.g. 3 7-9 12-.")
+    extract.add_argument(
+        "--output-dir",
+        "-o",
+        type=Path,
+        help="Write the parts as files into this directory (default: to stdout).",
+    )
+
+    args = parser.parse_args(argv)
+    if args.command == "split":
+        args.chunking = any(v is not None for v in (args.chunks, args.chunk_bytes, args.chunk_lines))
+        if args.jobs < 1:
+            split.error("--jobs must be at least 1")
+        if args.jobs > 1 and not (args.binary or args.chunking):
+            split.error("--jobs needs --binary")
+        if args.split_marker is None and not args.chunking:
+            split.error("the split_marker is required unless chunking")
+        if any(v is not None and v < 1 for v in (args.chunks, args.chunk_bytes, args.chunk_lines)):
+            split.error("chunk counts and sizes must be at least 1")
+    elif args.command == "index":
+        if args.jobs < 1:
+            index.error("--jobs must be at least 1")
+        if args.format is None:
+            args.format = "csv" if args.output and args.output.suffix.lower() == ".csv" else "json"
+    return args
+
+
+def main_index(args):
+    if not args.input_file.is_file():
+        print(f"Error: Input file '{args.input_file}' does not exist.", file=sys.stderr)
+        sys.exit(1)
+
+    index = build_index(args.input_file, args.split_marker, args.jobs)
+    if args.output is None:
+        write_index(index, sys.stdout, args.format)
+    else:
+        with args.output.open("w", encoding="utf-8", newline="") as f:
+            write_index(index, f, args.format)
+        print(f"Done. Indexed {len(index['parts'])} part(s) in '{args.output}'.")
+
+
+def main_extract(args):
+    if not args.input_file.is_file():
+        print(f"Error: Input file '{args.input_file}' does not exist.", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        index = read_index(args.index_file)
+        numbers = parse_part_numbers(args.parts, len(index["parts"]))
+        extract_parts(args.input_file, index, numbers, args.output_dir)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.output_dir is not None:
+        print(f"Done. Extracted {len(numbers)} part(s) to '{args.output_dir}'.")
 
 
 def main():
     args = parse_arguments()
+    if args.command == "index":
+        return main_index(args)
+    if args.command == "extract":
+        return main_extract(args)
 
     if not args.input_file.is_file():
         print(f"Error: Input file '{args.input_file}' does not exist.", file=sys.stderr)
         sys.exit(1)
 
-    num_files = split_file(
-        args.input_file,
-        args.output_dir,
-        args.split_marker,
-    )
+    if args.chunking:
+        try:
+            manifest = chunk_file(
+                args.input_file,
+                args.output_dir,
+                args.split_marker,
+                args.chunks,
+                args.chunk_bytes,
+                args.chunk_lines,
+                args.jobs,
+                args.compress,
+            )
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        lengths = [chunk["length"] for chunk in manifest["chunks"]] or [0]
+        print(f"Done. Created {len(manifest['chunks'])} chunk(s) of {min(lengths)} to {max(lengths)} "
+              f"bytes in '{args.output_dir}', see {MANIFEST_NAME}.")
+        return
+
+    if args.binary:
+        num_files = split_file_binary(
+            args.input_file,
+            args.output_dir,
+            args.split_marker,
+            args.jobs,
+            args.compress,
+        )
+    else:
+        num_files = split_file(
+            args.input_file,
+            args.output_dir,
+            args.split_marker,
+            args.compress,
+        )
 
     print(f"Done. Created {num_files} output file(s) in '{args.output_dir}'.")
 
@@ -46,39 +46,48 @@ SKIP_AFTER_DETECT = SHADOW_HEIGHT + OFFSET_AFTER_SHADOW + 2  # how many pixels t
 NEAR_DUPLICATE_MIN_DISTANCE = 20    # don't create splits closer than this
 # -----------------------------
 
-def matches_color_block(segment, shadow_rgb, tolerance=0, min_width=100):
+def find_shadow_rows(arr, shadow_rgb, tolerance=0, shadow_height=2, min_width=100):
     """
-    segment: numpy array shape (SHADOW_HEIGHT, width, 3)
-    shadow_rgb: tuple (r,g,b)
-    Returns True if there exists a contiguous horizontal run of columns
-    where every pixel in the vertical slice (for the SHADOW_HEIGHT rows)
+    arr: numpy array shape (height, width, 3)
+    Returns the rows y (ascending) where the shadow_height rows starting at y
+    contain a contiguous horizontal run of columns in which every pixel
     matches the shadow color within tolerance, and the run length >= min_width.
+    Works on the whole image at once instead of one slice per row.
     """
-    # Compute absolute difference from the target color for each pixel
-    # shape -> (SHADOW_HEIGHT, width, 3)
-    diff = np.abs(segment.astype(np.int16) - np.array(shadow_rgb, dtype=np.int16))
-
-    # for each pixel check if all three channels within tolerance
-    pixel_ok = np.all(diff <= tolerance, axis=2)  # shape (SHADOW_HEIGHT, width)
-
-    # for each column, check if all rows (the SHADOW_HEIGHT) are True
-    col_ok = np.all(pixel_ok, axis=0)  # shape (width,)
-
-    # Now find runs of True values in col_ok with length >= min_width
-    if not np.any(col_ok):
-        return False
-
-    # Find lengths of consecutive True segments
-    # convert to int and find boundaries
-    arr = col_ok.astype(np.int8)
-    # pad with zeros at both ends for easy diff
-    padded = np.concatenate([[0], arr, [0]])
-    diffs = np.diff(padded)
-    starts = np.where(diffs == 1)[0]  # indices where a run starts
-    ends = np.where(diffs == -1)[0]   # indices where a run ends
-    lengths = ends - starts
-    # check if any run long enough
-    return np.any(lengths >= min_width)
+    height, width, _ = arr.shape
+    run = max(1, min_width)  # a run of length >= 0 still needs one matching column
+    if height < shadow_height or run > width or tolerance < 0:
+        return np.array([], dtype=np.intp)
+
+    # Per-pixel match, one color plane at a time (contiguous, much faster
+    # than comparing the interleaved RGB array):
+    # |pixel - color| <= tolerance  <=>  (pixel - low) <= high - low  in uint8,
+    # since values below low wrap around to large numbers
+    planes = np.ascontiguousarray(np.moveaxis(arr, 2, 0))
+    pixel_ok = np.ones((height, width), dtype=bool)
+    for plane, color in zip(planes, shadow_rgb):
+        low = np.uint8(max(0, color - tolerance))
+        high = np.uint8(min(255, color + tolerance))
+        pixel_ok &= (plane - low) <= (high - low)
+
+    # Rolling AND over shadow_height rows: column x matches for the block
+    # starting at y if all its pixels y .. y + shadow_height - 1 match
+    rows = height - shadow_height + 1
+    col_ok = pixel_ok[:rows].copy()  # shape (rows, width)
+    for k in range(1, shadow_height):
+        col_ok &= pixel_ok[k:k + rows]
+
+    # Only rows with at least min_width matching columns can hold a run
+    candidates = np.flatnonzero(np.count_nonzero(col_ok, axis=1) >= run)
+    if candidates.size == 0:
+        return candidates
+
+    # A run of >= min_width columns exists where a window of min_width
+    # columns is completely True (difference of the cumulative sum)
+    counts = np.zeros((candidates.size, width + 1), dtype=np.int32)
+    np.cumsum(col_ok[candidates], axis=1, out=counts[:, 1:])
+    has_run = np.any(counts[:, run:] - counts[:, :-run] == run, axis=1)
+    return candidates[has_run]
 
 def process_image(image_path):
     img = Image.open(image_path).convert("RGB")
@@ -86,19 +95,17 @@ def process_image(image_path):
     height, width, _ = arr.shape
 
     split_positions = []
-    y = 0
-    while y <= height - SHADOW_HEIGHT:
-        segment = arr[y:y + SHADOW_HEIGHT, :, :]  # shape (SHADOW_HEIGHT, width, 3)
-        if matches_color_block(segment, SHADOW_COLOR, COLOR_TOLERANCE, MIN_SHADOW_WIDTH):
-            # compute split position after shadow + OFFSET_AFTER_SHADOW
-            split_y = y + SHADOW_HEIGHT + OFFSET_AFTER_SHADOW
-            # clamp
-            split_y = min(split_y, height)
-            split_positions.append(split_y)
-            # skip ahead to avoid re-detecting the same shadow
-            y += SKIP_AFTER_DETECT
+    next_y = 0
+    for y in find_shadow_rows(arr, SHADOW_COLOR, COLOR_TOLERANCE, SHADOW_HEIGHT, MIN_SHADOW_WIDTH):
+        # skip rows right after a detection to avoid re-detecting the same shadow
+        if y < next_y:
             continue
-        y += 1
+        # compute split position after shadow + OFFSET_AFTER_SHADOW
+        split_y = y + SHADOW_HEIGHT + OFFSET_AFTER_SHADOW
+        # clamp
+        split_y = min(split_y, height)
+        split_positions.append(int(split_y))
+        next_y = y + SKIP_AFTER_DETECT
 
     # Remove near-duplicates (if any) and ensure ascending order
     cleaned = []
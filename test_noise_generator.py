@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+import noise_generator as ng
+
+
+@pytest.mark.parametrize("n_samples", [0, 1, 2, 3])
+def test_pink_noise_of_very_short_lengths(n_samples):
+    pink = ng.generate_pink_noise(n_samples, 44100)
+    assert pink.shape == (n_samples,)
+    assert np.all(np.isfinite(pink))
+    assert np.max(np.abs(pink), initial=0.0) <= 1.0
+
+
+def test_only_block_sized_shapes_are_cached():
+    ng._cached_spectral_shape.cache_clear()
+    ng.spectral_shape(ng.BLOCK_SIZE, 44100, 1.0)
+    ng.spectral_shape(ng.SHAPE_CACHE_MAX + 2, 44100, 1.0)
+    assert ng._cached_spectral_shape.cache_info().currsize == 1
+
+
+def test_uncached_shape_matches_cached_one():
+    n = ng.SHAPE_CACHE_MAX
+    cached = ng.spectral_shape(n, 44100, 1.0)
+    assert np.array_equal(cached, ng._spectral_shape(n, 44100, 1.0, None, None, (), 0.0))
+    assert not cached.flags.writeable
@@ -0,0 +1,92 @@
+import remove_duplicate_songs
+from remove_duplicate_songs import (TagCache, base_filename, extract_title, find_similar_titles, normalize_title,
+                                    plan_moves, read_tags_cached, resolve_cluster, title_variants)
+
+
+def groups_of(filenames, threshold=0.9):
+    groups = find_similar_titles([normalize_title(f) for f in filenames], threshold)
+    return sorted(sorted(filenames[i] for i in g) for g in groups)
+
+
+def test_vip_is_not_a_duplicate_of_the_original():
+    files = ["Artist - Hero (feat. Elizaveta) (VIP).mp3", "Artist - Hero (feat. Elizaveta).mp3"]
+    assert groups_of(files) == []
+
+
+def test_remixes_are_not_duplicates_of_each_other_or_the_original():
+    files = ["Artist - Song (Foo Remix).mp3", "Artist - Song (Bar Remix).mp3", "Artist - Song.mp3"]
+    assert groups_of(files) == []
+
+
+def test_numbered_sequel_is_not_a_duplicate():
+    assert groups_of(["Rogue - Atlas 2.mp3", "Rogue - Atlas.mp3"]) == []
+
+
+def test_same_version_with_different_spelling_is_grouped():
+    files = [
+        "Artist - Hero (feat. Elizaveta) (VIP).mp3",
+        "Artist – Hero ft. Elizaveta [VIP].flac",
+        "Artist - Hero (feat. Elizaveta) (Original Mix).mp3",
+        "Artist - Hero (feat Elizaveta).m4a",
+    ]
+    assert groups_of(files) == sorted([sorted(files[:2]), sorted(files[2:])])
+
+
+def test_groups_are_not_transitive():
+    # b is close to a and to c, but a and c are too far apart to be one song
+    a, b, c = "Artist - abcdefghij.mp3", "Artist - abcdefghiX.mp3", "Artist - abcdefghYX.mp3"
+    groups = find_similar_titles([normalize_title(f) for f in (a, b, c)], 0.9)
+    assert all(not {0, 2} <= set(g) for g in groups)
+
+
+def song(path, album, title):
+    file = path.rsplit("/", 1)[-1]
+    return {"path": path, "file": file, "key": base_filename(file),
+            "title_variants": title_variants(extract_title(file)),
+            "tags": {"album": album, "title": title}}
+
+
+def test_content_cluster_keeps_album_version_by_tag_title():
+    album = song("lib/Artist - Hero.flac", "Great Album", "Hero")
+    single = song("lib/hero_final.flac", "Hero", "Hero")
+    moves, failure = resolve_cluster([single, album])
+    assert failure is None
+    assert [(s["path"], k["path"]) for s, k in moves] == [("lib/hero_final.flac", "lib/Artist - Hero.flac")]
+
+
+def test_content_cluster_with_third_copy_is_not_a_failure():
+    album = song("lib/Artist - Hero.flac", "Great Album", "Hero")
+    single = song("lib/hero_final.flac", "Hero", "Hero")
+    copy = song("lib/Hero.flac", "Hero", "Hero")
+    moves, failure = resolve_cluster([single, copy, album])
+    assert failure is None
+    assert sorted(s["path"] for s, k in moves) == ["lib/Hero.flac", "lib/hero_final.flac"]
+    assert all(k is album for _, k in moves)
+
+
+def test_unreadable_tags_are_cached_until_the_file_changes(tmp_path, monkeypatch):
+    path = tmp_path / "broken.mp3"
+    path.write_bytes(b"not audio")
+    reads = []
+    monkeypatch.setattr(remove_duplicate_songs, "read_tags", lambda p: reads.append(p))
+    cache_file = str(tmp_path / "tags.json")
+
+    def run(mtime_ns):
+        songs = [{"path": str(path), "size": 9, "mtime_ns": mtime_ns}]
+        cache = TagCache(cache_file)
+        read_tags_cached(songs, cache, 1)
+        cache.save()
+        return songs[0]["tags"]
+
+    assert run(1) is None
+    assert run(1) is None
+    assert len(reads) == 1
+    run(2)
+    assert len(reads) == 2
+
+
+def test_plan_paths_are_absolute(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    [move] = plan_moves([({"path": "lib/a.mp3"}, {"path": "lib/b.mp3"})], "removed")
+    assert move == {"src": str(tmp_path / "lib" / "a.mp3"), "dst": str(tmp_path / "removed" / "a.mp3"),
+                    "reason": f"duplicate of {tmp_path / 'lib' / 'b.mp3'}"}
@@ -0,0 +1,60 @@
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import mp4_to_mp3
+import split_file
+
+
+SIZES = {
+    "500": 500,
+    "500b": 500,
+    "200k": 200 * 1024,
+    "200KB": 200 * 1024,
+    "1.5G": int(1.5 * 1024 ** 3),
+    " 2m ": 2 * 1024 ** 2,
+    "1t": 1024 ** 4,
+}
+
+
+@pytest.mark.parametrize("parse_size", [split_file.parse_size, mp4_to_mp3.parse_size])
+@pytest.mark.parametrize("text, size", SIZES.items())
+def test_parse_size_suffixes(parse_size, text, size):
+    assert parse_size(text) == size
+
+
+@pytest.mark.parametrize("parse_size", [split_file.parse_size, mp4_to_mp3.parse_size])
+@pytest.mark.parametrize("text", ["", "b", "k", "12x", "1.2.3m"])
+def test_parse_size_rejects_garbage(parse_size, text):
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_size(text)
+
+
+def test_parse_size_units_are_the_same():
+    assert split_file.SIZE_UNITS == mp4_to_mp3.SIZE_UNITS
+
+
+@pytest.mark.parametrize("chunk_lines", [1, 2, 3, 7, 100])
+@pytest.mark.parametrize("data", [b"", b"\n", b"\n" * 250, b"a\nbb\n\nccc\n" * 40 + b"tail"])
+def test_line_chunks_cut_every_chunk_lines_lines(data, chunk_lines):
+    expected = [0]
+    ends = [i + 1 for i, byte in enumerate(data) if byte == ord("\n")]
+    expected += [end for end in ends[chunk_lines - 1::chunk_lines] if end < len(data)]
+    assert split_file.line_chunks(data, chunk_lines=chunk_lines) == expected
+
+
+def test_extract_appends_to_redirected_stdout(tmp_path):
+    log = tmp_path / "log.txt"
+    log.write_text("".join(f"=== BEGIN {i} ===\n{'x' * 100}\n" for i in range(5)))
+    index = tmp_path / "log.index.json"
+    script = Path(split_file.__file__)
+    subprocess.run([sys.executable, script, "index", log, "BEGIN", "-o", index], check=True, capture_output=True)
+
+    out = tmp_path / "out.txt"
+    out.write_text("head\n")
+    with out.open("ab") as f:       # like "split_file.py extract ... >> out.txt"
+        subprocess.run([sys.executable, script, "extract", log, index, "2"], stdout=f, check=True)
+    assert out.read_text() == f"head\n=== BEGIN 1 ===\n{'x' * 100}\n"